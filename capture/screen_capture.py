@@ -44,11 +44,16 @@ class ScreenCapture:
         log.info("Screen Capture ready on monitor [%d]: %s", 
                  self.monitor_index, monitors[self.monitor_index])
 
-    def capture(self, region: dict | None = None) -> np.ndarray:
+    def capture(self, region: dict | None = None, out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Capture a region or full screen.
         If region is provided, it must be in logical coordinates.
         mss will handle Retina/High-DPI scaling automatically if monitor/region is correct.
+
+        If *out* is a contiguous uint8 BGR array of the captured size, the
+        frame is written into it and *out* is returned (no allocation); any
+        frame previously held in that buffer is overwritten. Otherwise a new
+        array is returned.
         """
         try:
             # If region is provided, it overrides monitor index
@@ -56,8 +61,12 @@ class ScreenCapture:
             monitor = self.sct.monitors[self.monitor_index] if not region else region
             
             screenshot = self.sct.grab(monitor)
-            img = np.array(screenshot)
+            # View of mss's BGRA buffer (no copy); the BGR conversion is the only write
+            img = np.asarray(screenshot)
             # Convert BGRA to BGR for OpenCV
+            if (out is not None and out.dtype == np.uint8 and out.flags.c_contiguous
+                    and out.shape == (img.shape[0], img.shape[1], 3)):
+                return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR, dst=out)
             return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
         except Exception as e:
             log.error("Capture failed: %s", e)
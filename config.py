@@ -55,11 +55,20 @@ OCR_USE_ANGLE_CLS: bool   = True
 OCR_MIN_CONFIDENCE: float = 0.55
 OCR_PREWARM: bool         = True    # Load model once at startup
 OCR_UPSCALE_FACTOR: float = 3.0     # Scaling for small context recovery
+OCR_SHARP_SKIP: float     = 500.0   # Laplacian variance above which preprocessing is skipped
+OCR_ENABLE_MKLDNN: bool   = os.name != "nt"   # oneDNN CPU kernels (PIR/Runtime errors on Windows)
+OCR_CPU_THREADS: int      = os.cpu_count() or 4
+OCR_REC_BATCH_NUM: int    = 16      # Text lines per recognition batch
+OCR_PRECISION: str        = "fp32"  # "fp16" = bf16 oneDNN kernels; "int8" needs quantized det/rec models
+OCR_MKLDNN_CACHE_CAPACITY: int = 10  # oneDNN shape-cache entries (3.x; 2.x fixes it at 10)
+OCR_SUBPROCESS: bool      = False   # Host PaddleOCR in a worker process (frames via shared memory)
+OCR_WORKER_TIMEOUT_SEC: int = 60    # Max wait for one worker inference
 
 # ── Vision Detection (Contours) ──────────────────────────────────────────────
 EDGE_CANNY_LOW: int       = 50
 EDGE_CANNY_HIGH: int      = 150
 MIN_CONTOUR_AREA: int     = 100     # Pixels squared
+EDGE_DOWNSCALE: int       = 1       # Edge detection at 1/N resolution (>1 loses many 1-px borders)
 
 # ── Action Stability ──────────────────────────────────────────────────────────
 MAX_ACTION_RETRIES: int     = 3
@@ -77,6 +86,7 @@ LOG_FILE: Path              = LOGS_DIR / "agent.log"
 # ── Action Timing & Matching ─────────────────────────────────────────────────
 STEP_DELAY_SEC: float       = 0.5   # Delay between action and verification
 FUZZY_MATCH_THRESHOLD: float = 75.0 # Min score for element recognition
+TEMPLATE_MATCH_WORKERS: int = min(4, os.cpu_count() or 1)  # Threads for the template scale sweep (1 = serial)
 
 # ── Error Codes ───────────────────────────────────────────────────────────────
 ERROR_CODES = {
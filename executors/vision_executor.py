@@ -51,7 +51,7 @@ class VisionExecutor(BaseExecutor):
             if img is not None and np.mean(img) < 2.5:
                 log.warning("Detected blank/black frame. Waiting for window to render...")
                 time.sleep(1.8)
-                img = capturer.capture(self.region)
+                img = capturer.capture(self.region, out=img)   # blank frame is discarded
             return img
 
         start_time = time.time()
@@ -0,0 +1,98 @@
+"""
+Regression tests for the coarse-to-fine template search.
+
+A row of near-identical controls ("Btn1" … "Btn40") is the worst case for
+the pyramid: at 1/4 resolution the look-alike labels can outscore the true
+button, so the search must still land on the exact crop.
+"""
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from vision.template_matcher import TemplateMatcher, _match, _peak
+
+
+def _lookalike_frame(seed: int) -> tuple[np.ndarray, np.ndarray, tuple[int, int]]:
+    """1080p frame of 40 similar buttons, an exact crop of one, and its centre."""
+    rng   = np.random.default_rng(seed)
+    frame = np.full((1080, 1920, 3), 240, np.uint8)
+    boxes = []
+    for k in range(40):
+        x = 40 + (k % 8) * 230
+        y = 60 + (k // 8) * 200
+        cv2.rectangle(frame, (x, y), (x + 120, y + 36), (200, 200, 200), -1)
+        cv2.rectangle(frame, (x, y), (x + 120, y + 36), (90, 90, 90), 1)
+        cv2.putText(frame, f"Btn{k + 1}", (x + 14, y + 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+        boxes.append((x - 2, y - 2))
+    x, y = boxes[int(rng.integers(len(boxes)))]
+    crop = frame[y:y + 41, x:x + 125].copy()
+    return frame, crop, (x + 125 // 2, y + 41 // 2)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_find_from_crop_picks_exact_button_among_lookalikes(seed: int) -> None:
+    frame, crop, (tx, ty) = _lookalike_frame(seed)
+
+    hit = TemplateMatcher().find_from_crop(crop, frame)
+
+    assert hit is not None
+    assert abs(hit[0] - tx) <= 1 and abs(hit[1] - ty) <= 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_from_crop_picks_scaled_button_among_lookalikes(seed: int) -> None:
+    # A crop taken at 90 % size is found at the 1.15 sweep scale, whose coarse
+    # peak trails the look-alikes' at other scales.
+    frame, crop, (tx, ty) = _lookalike_frame(seed)
+    crop = cv2.resize(crop, None, fx=0.9, fy=0.9)
+
+    hit = TemplateMatcher().find_from_crop(crop, frame)
+
+    assert hit is not None
+    assert abs(hit[0] - tx) <= 3 and abs(hit[1] - ty) <= 3
+
+
+def test_find_from_crop_rejects_absent_control() -> None:
+    frame, _, _ = _lookalike_frame(0)
+    absent      = np.full((41, 125, 3), 240, np.uint8)
+    cv2.putText(absent, "Quit", (14, 27), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+
+    assert TemplateMatcher().find_from_crop(absent, frame) is None
+
+
+def test_nms_without_peaks_above_threshold_is_empty() -> None:
+    assert TemplateMatcher._nms(np.zeros((10, 10), np.float32), (3, 3), 5) == []
+
+
+def _min_max_peak(scores: np.ndarray) -> tuple[float, tuple[int, int]]:
+    _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+    return max_val, max_loc
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_peak_matches_minmaxloc_on_random_maps(seed: int) -> None:
+    rng    = np.random.default_rng(seed)
+    scores = rng.uniform(-1, 1, (int(rng.integers(1, 60)), int(rng.integers(1, 60)))).astype(np.float32)
+
+    assert _peak(scores) == _min_max_peak(scores)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_peak_matches_minmaxloc_on_tied_maxima(seed: int) -> None:
+    # Coarse quantization leaves many equal maxima; both must pick the first
+    # in row-major order.
+    rng    = np.random.default_rng(seed)
+    scores = (rng.integers(-3, 3, (int(rng.integers(1, 40)), int(rng.integers(1, 40)))) / 3).astype(np.float32)
+
+    assert _peak(scores) == _min_max_peak(scores)
+
+
+def test_peak_matches_minmaxloc_on_fully_masked_map() -> None:
+    # A flat haystack masks every window to -1.
+    scores = _match(np.full((40, 60), 128, np.uint8), np.full((8, 10), 200, np.uint8))
+
+    assert (scores == -1.0).all()
+    assert _peak(scores) == _min_max_peak(scores) == (-1.0, (0, 0))
@@ -227,10 +227,10 @@ steps:
                     exported_elements.append({
                         "id": i,
                         "label": elem.get('label', '').strip(),
-                        "box": box,
+                        "box": box.tolist(),
                         "center_native": [nx, ny],
                         "center_screen": [sx, sy],
-                        "size": [box[2]-box[0], box[3]-box[1]],
+                        "size": [int(box[2]-box[0]), int(box[3]-box[1])],
                         "source": elem.get("source", "unknown")
                     })
 
@@ -238,7 +238,7 @@ steps:
                 mem_dir.mkdir(exist_ok=True)
                 
                 # Save visual map & JSON
-                debug_img = detector.annotate(img, elements)
+                debug_img = detector.annotate(img, elements, reuse=True)
                 cv2.imwrite(str(mem_dir / "ui_map.png"), debug_img)
                 
                 ui_map = {
@@ -348,10 +348,10 @@ def scan_suite_ui(suite_id):
             exported_elements.append({
                 "id": i,
                 "label": elem.get('label', '').strip(),
-                "box": box,
+                "box": box.tolist(),
                 "center_native": [nx, ny],
                 "center_screen": [sx, sy],
-                "size": [box[2]-box[0], box[3]-box[1]],
+                "size": [int(box[2]-box[0]), int(box[3]-box[1])],
                 "source": elem.get("source", "unknown")
             })
 
@@ -359,7 +359,7 @@ def scan_suite_ui(suite_id):
         mem_dir = suite_dir / "memory"
         mem_dir.mkdir(exist_ok=True)
         
-        debug_img = detector.annotate(img, elements)
+        debug_img = detector.annotate(img, elements, reuse=True)
         cv2.imwrite(str(mem_dir / "ui_map.png"), debug_img)
         
         ui_map = {
@@ -11,6 +11,20 @@ from utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# xxhash is optional: fastest content hash for the vision caches.
+try:
+    import xxhash
+
+    def content_digest(buf) -> int:
+        """64-bit hash of a bytes-like buffer (e.g. ndarray.data)."""
+        return xxhash.xxh3_64_intdigest(buf)
+except ImportError:
+    import hashlib
+
+    def content_digest(buf) -> int:
+        """64-bit hash of a bytes-like buffer (e.g. ndarray.data)."""
+        return int.from_bytes(hashlib.blake2b(buf, digest_size=8).digest(), "little")
+
 
 def save_image(image: np.ndarray, path: str) -> None:
     """
@@ -67,9 +81,9 @@ def image_hash(image: np.ndarray) -> str:
     small = cv2.resize(image, (8, 8))
     gray  = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
     mean  = gray.mean()
-    bits  = (gray > mean).flatten()
+    bits  = np.packbits(gray > mean)    # 64 bits → 8 bytes, row-major, MSB first
     # Pack 64 bits into 16 hex nibbles
-    value = int("".join("1" if b else "0" for b in bits), 2)
+    value = int.from_bytes(bits.tobytes(), "big")
     return f"{value:016x}"
 
 
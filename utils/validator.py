@@ -8,6 +8,16 @@ import os
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+# libyaml's C loader is ~10x faster; not every PyYAML build ships it.
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# ── Playbook schema constants ────────────────────────────────────────────────
+_VALID_ACTIONS   = frozenset({"click", "type", "wait_for", "pause", "screenshot"})
+_TARGET_REQUIRED = frozenset({"click", "type"})
+
 class ValidationResult:
     def __init__(self, is_valid: bool, errors: List[str] = None, warnings: List[str] = None):
         self.is_valid = is_valid
@@ -25,12 +35,9 @@ def validate_playbook_schema(playbook_path: Path) -> ValidationResult:
     errors = []
     warnings = []
     
-    if not playbook_path.exists():
-        return ValidationResult(False, [f"Playbook file not found: {playbook_path}"])
-        
     try:
         content = playbook_path.read_text()
-        data = yaml.safe_load(content)
+        data = yaml.load(content, Loader=_YamlLoader)
         
         if not isinstance(data, dict):
             return ValidationResult(False, ["Playbook must be a YAML dictionary"])
@@ -44,21 +51,20 @@ def validate_playbook_schema(playbook_path: Path) -> ValidationResult:
         elif len(steps) == 0:
             warnings.append("Playbook has no steps")
             
-        valid_actions = {"click", "type", "wait_for", "pause", "screenshot"}
-        
-        for i, step in enumerate(steps):
+        errors_append = errors.append
+        for i, step in enumerate(steps, 1):
             action = step.get("action")
             if not action:
-                errors.append(f"Step {i+1}: Missing 'action'")
-            elif action not in valid_actions:
-                errors.append(f"Step {i+1}: Invalid action '{action}'")
+                errors_append(f"Step {i}: Missing 'action'")
+            elif action not in _VALID_ACTIONS:
+                errors_append(f"Step {i}: Invalid action '{action}'")
             
             # Semantic check
-            desc = step.get("description", "")
-            target = step.get("target", "")
-            if action in ["click", "type"] and not target:
-                errors.append(f"Step {i+1}: Action '{action}' requires a 'target'")
+            if action in _TARGET_REQUIRED and not step.get("target", ""):
+                errors_append(f"Step {i}: Action '{action}' requires a 'target'")
                 
+    except FileNotFoundError:
+        return ValidationResult(False, [f"Playbook file not found: {playbook_path}"])
     except Exception as e:
         errors.append(f"YAML Parse Error: {str(e)}")
         
@@ -15,13 +15,25 @@ Storage schema (memory/click_memory.json):
       }
   }
 }
+
+Updates are appended to memory/click_memory.wal as one JSON line per
+operation and replayed on load:
+    {"op": "save", "key": "ok", "r": "a3f01b72...", "cx": 843, "cy": 412, ...}
+    {"op": "del",  "key": "ok", "r": "a3f01b72..."}
+    {"op": "del",  "key": "ok"}                      # whole label evicted
+The WAL is folded back into click_memory.json once it outgrows the base file.
 """
 from __future__ import annotations
 
+import atexit
 import hashlib
 import json
 import logging
+import queue
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
@@ -30,14 +42,37 @@ from vision.text_normalizer import normalize
 
 log = logging.getLogger("ClickMemory")
 
+# orjson is optional: ~3-5x faster encode/decode when installed.
+try:
+    import orjson
+
+    def _dumps(obj: Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any, indent: bool = False) -> bytes:
+        if indent:
+            return json.dumps(obj, indent=2).encode("utf-8")
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
 _MEMORY_FILE = config.MEMORY_DIR / "click_memory.json"
+_WAL_FILE    = config.MEMORY_DIR / "click_memory.wal"
 _MAX_ENTRIES = 1000  # Total keys across all regions
+_WAL_RATIO   = 2     # Compact once the WAL is this many times the base file
+_WAL_MIN     = 64 * 1024  # ...but never before it reaches this many bytes
 
 
 class ClickMemory:
     """
-    Thread-safe-enough (GIL) in-process cache backed by a JSON file.
-    Supports multiple window layouts via region hashing.
+    Thread-safe in-process cache backed by a JSON file plus an append-only
+    write-ahead log. Supports multiple window layouts via region hashing.
+
+    Mutations happen under a lock and enqueue a WAL operation; a daemon
+    writer thread drains the queue, so callers never block on disk I/O.
+    Bursts of saves are coalesced into a single write + flush.
     """
 
     _instance: Optional["ClickMemory"] = None
@@ -45,13 +80,24 @@ class ClickMemory:
     def __new__(cls, region: Optional[Dict[str, Any]] = None):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._data: Dict[str, Any] = {}
+            # Label order tracks recency of save(): oldest first (LRU).
+            cls._instance._data: "OrderedDict[str, Any]" = OrderedDict()
             cls._instance._loaded = False
+            cls._instance._wal = None
+            cls._instance._base_size = 0
+            cls._instance._lock = threading.Lock()
+            cls._instance._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+            cls._instance._writer = threading.Thread(
+                target=cls._instance._writer_loop, name="click-memory-writer", daemon=True
+            )
+            cls._instance._writer.start()
+            atexit.register(cls._instance.close)
         return cls._instance
 
     def __init__(self, region: Optional[Dict[str, Any]] = None):
-        if not self._loaded:
-            self._load()
+        with self._lock:
+            if not self._loaded:
+                self._load()
         # Note: self._current_region_hash is NOT used in get/save anymore
         # to avoid singleton state corruption. We compute it on demand or 
         # pass the region object.
@@ -67,11 +113,8 @@ class ClickMemory:
             return None
             
         key = normalize(label)
-        label_entries = self._data.get(key)
-        if not label_entries:
-            return None
-            
-        entry = label_entries.get(r_hash)
+        with self._lock:
+            entry = self._data.get(key, {}).get(r_hash)
         if not entry:
             return None
             
@@ -84,19 +127,22 @@ class ClickMemory:
             return
             
         key = normalize(label)
-        if key not in self._data:
-            self._data[key] = {}
+        with self._lock:
+            if key not in self._data:
+                self._data[key] = {}
+            self._data.move_to_end(key)
+
+            existing = self._data[key].get(r_hash, {})
+            entry = {
+                "cx":          cx,
+                "cy":          cy,
+                "hits":        existing.get("hits", 0) + 1,
+                "last_used":   datetime.now().isoformat(timespec="seconds"),
+            }
+            self._data[key][r_hash] = entry
             
-        existing = self._data[key].get(r_hash, {})
-        self._data[key][r_hash] = {
-            "cx":          cx,
-            "cy":          cy,
-            "hits":        existing.get("hits", 0) + 1,
-            "last_used":   datetime.now().isoformat(timespec="seconds"),
-        }
-        
-        self._evict()
-        self._write()
+            self._append({"op": "save", "key": key, "r": r_hash, **entry})
+            self._evict()
         log.debug("ClickMemory saved: '%s' [%s] → (%d, %d)", 
                   label, r_hash[:8], cx, cy)
 
@@ -107,41 +153,138 @@ class ClickMemory:
             return
             
         key = normalize(label)
-        if key in self._data and r_hash in self._data[key]:
+        with self._lock:
+            if key not in self._data or r_hash not in self._data[key]:
+                return
             del self._data[key][r_hash]
             if not self._data[key]:
                 del self._data[key]
-            self._write()
-            log.debug("ClickMemory invalidated: '%s' [%s]", label, r_hash[:8])
+            self._append({"op": "del", "key": key, "r": r_hash})
+        log.debug("ClickMemory invalidated: '%s' [%s]", label, r_hash[:8])
+
+    def flush(self) -> None:
+        """Block until every queued update has reached the WAL."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Drain pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
 
     # ── Private ────────────────────────────────────────────────────────────────
 
     def _load(self) -> None:
         try:
             if _MEMORY_FILE.exists():
-                self._data = json.loads(_MEMORY_FILE.read_text(encoding="utf-8"))
+                raw = _MEMORY_FILE.read_bytes()
+                self._data = OrderedDict(_loads(raw))
+                self._base_size = len(raw)
         except Exception as exc:
             log.warning("Could not load click memory: %s — starting fresh.", exc)
-            self._data = {}
+            self._data = OrderedDict()
+        self._replay()
         self._loaded = True
 
-    def _write(self) -> None:
+    def _replay(self) -> None:
+        """Apply WAL operations recorded since the last compaction."""
         try:
-            _MEMORY_FILE.write_text(
-                json.dumps(self._data, indent=2), encoding="utf-8"
-            )
+            if not _WAL_FILE.exists():
+                return
+            with _WAL_FILE.open("rb") as fh:
+                for line in fh:
+                    try:
+                        op = _loads(line)
+                    except ValueError:
+                        continue  # torn tail line from an interrupted write
+                    key, r_hash = op.pop("key"), op.pop("r", None)
+                    if op.pop("op") == "save":
+                        self._data.setdefault(key, {})[r_hash] = op
+                        self._data.move_to_end(key)
+                    elif r_hash is None:
+                        self._data.pop(key, None)
+                    elif r_hash in self._data.get(key, {}):
+                        del self._data[key][r_hash]
+                        if not self._data[key]:
+                            del self._data[key]
+        except Exception as exc:
+            log.warning("Could not replay click memory WAL: %s", exc)
+
+    def _append(self, op: Dict[str, Any]) -> None:
+        """Queue one WAL operation for the writer thread."""
+        self._queue.put(op)
+
+    def _writer_loop(self) -> None:
+        """Writer thread: drain queued ops, append them to the WAL, compact as needed."""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._write_ops([op for op in batch if op is not None])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                if self._wal is not None:
+                    self._wal.close()
+                    self._wal = None
+                return
+
+    def _write_ops(self, ops: list) -> None:
+        if not ops:
+            return
+        try:
+            if self._wal is None:
+                self._wal = _WAL_FILE.open("ab")
+            self._wal.write(b"".join(_dumps(op) + b"\n" for op in ops))
+            self._wal.flush()
+        except Exception as exc:
+            log.warning("Could not append to click memory WAL: %s", exc)
+            return
+
+        if self._wal.tell() > max(_WAL_MIN, _WAL_RATIO * self._base_size):
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Rewrite the consolidated JSON file and truncate the WAL.
+        Runs on the writer thread. Ops still queued behind the snapshot are
+        already reflected in it; replaying them later is idempotent.
+        """
+        with self._lock:
+            # Entries are replaced, never mutated, so one level of copy suffices.
+            snapshot = OrderedDict((k, dict(v)) for k, v in self._data.items())
+        if not self._write(snapshot):
+            return
+        try:
+            if self._wal is not None:
+                self._wal.close()
+            self._wal = _WAL_FILE.open("wb")
+        except Exception as exc:
+            log.warning("Could not truncate click memory WAL: %s", exc)
+            self._wal = None
+
+    def _write(self, data: Dict[str, Any]) -> bool:
+        try:
+            raw = _dumps(data, indent=True)
+            tmp = _MEMORY_FILE.with_suffix(".tmp")
+            tmp.write_bytes(raw)
+            tmp.replace(_MEMORY_FILE)
+            self._base_size = len(raw)
+            return True
         except Exception as exc:
             log.warning("Could not persist click memory: %s", exc)
+            return False
 
     def _evict(self) -> None:
-        """Simple eviction if storage grows too large."""
-        if len(self._data) <= _MAX_ENTRIES:
-            return
-        # Very crude eviction: just pop a few keys
-        # In a real enterprise system, we'd do global LRU across all sub-keys.
-        keys = list(self._data.keys())
-        for i in range(len(keys) - _MAX_ENTRIES):
-            del self._data[keys[i]]
+        """Drop least-recently-saved labels once storage grows too large. Caller holds the lock."""
+        while len(self._data) > _MAX_ENTRIES:
+            key, _ = self._data.popitem(last=False)
+            self._append({"op": "del", "key": key})
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -150,8 +293,14 @@ def _hash_region(region: Optional[Dict[str, Any]]) -> str:
     """Stable hash of region geometry."""
     if not region:
         return "global"
+    return _hash_rect(*(region.get(k, 0) for k in ("height", "left", "top", "width")))
+
+
+@lru_cache(maxsize=64, typed=True)   # 1 and 1.0 serialise differently
+def _hash_rect(height: Any, left: Any, top: Any, width: Any) -> str:
+    """Memoized digest of one rect; the same few regions are looked up every step."""
     canonical = json.dumps(
-        {k: region.get(k, 0) for k in ("left", "top", "width", "height")},
+        {"height": height, "left": left, "top": top, "width": width},
         sort_keys=True,
     )
     return hashlib.sha256(canonical.encode()).hexdigest()[:16]
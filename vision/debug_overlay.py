@@ -15,10 +15,14 @@ Color coding:
 """
 from __future__ import annotations
 
+import atexit
 import logging
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
@@ -34,14 +38,36 @@ _CLR_GENERAL  = (0,  165, 255)   # orange — ordinary OCR box
 _CLR_REJECT   = (60,  60, 180)   # muted  — below threshold
 _CLR_TEXT_BG  = (0,    0,   0)   # black  — label background
 
+# ── Background writer ─────────────────────────────────────────────────────────
+# PNG encode + disk write are handed to a single worker so the automation
+# loop never blocks on them. At most _MAX_PENDING frames may be in flight —
+# beyond that, callers wait (back-pressure).
+_PNG_PARAMS  = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+_MAX_PENDING = 8
+_IO_POOL     = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-io")
+_IO_SLOTS    = threading.BoundedSemaphore(_MAX_PENDING)
+atexit.register(_IO_POOL.shutdown, wait=True)
+
+
+def is_debug_enabled() -> bool:
+    """
+    True when debug frames will actually be written.
+
+    Callers should check this before building scores / OCR payloads that
+    only exist to feed save_debug_frame(), so production runs with debug
+    off skip that preparation entirely.
+    """
+    return config.SAVE_DEBUG_FRAMES
+
 
 def draw_debug_overlay(
     frame: np.ndarray,
     ocr_results: List[Dict[str, Any]],
     target: str,
     matched_idx: Optional[int],
-    scores: Optional[List[float]] = None,
+    scores: Optional[Sequence[float]] = None,
     action_name: str = "click",
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Render an annotated debug image.
@@ -51,38 +77,61 @@ def draw_debug_overlay(
         ocr_results:  List of OCR dicts with 'text', 'box', 'confidence'.
         target:       The label we were searching for.
         matched_idx:  Index into ocr_results of the winning match (or None).
-        scores:       Fuzzy scores parallel to ocr_results (optional).
+        scores:       Fuzzy scores parallel to ocr_results (list or ndarray, optional).
         action_name:  Used in the filename.
+        out:          Optional scratch buffer (same shape/dtype as frame) to
+                      draw into instead of allocating a fresh copy. Callers
+                      rendering many frames can reuse one buffer.
 
     Returns:
-        Annotated BGR image (useful for tests / inspection).
+        Annotated BGR image (useful for tests / inspection). This is *out*
+        when a buffer was supplied.
     """
-    canvas = frame.copy()
+    if out is not None:
+        np.copyto(out, frame)
+        canvas = out
+    else:
+        canvas = frame.copy()
     h, w   = canvas.shape[:2]
     is_short = len(target.strip()) <= 3
 
+    # Boxes are bucketed by style and drawn in one OpenCV call per bucket
+    # after the loop; label backgrounds and text are per-box. Order:
+    # backgrounds, then outlines, then text.
+    groups: Dict[Tuple[Tuple[int, int, int], int], List[np.ndarray]] = defaultdict(list)
+    label_bgs: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+    labels: List[Tuple[str, Tuple[int, int], Tuple[int, int, int]]] = []
+
+    thresh       = config.FUZZY_MATCH_THRESHOLD
+    font         = cv2.FONT_HERSHEY_SIMPLEX
+    clr_match    = _CLR_MATCH
+    clr_cand     = _CLR_CAND
+    clr_general  = _CLR_GENERAL
+    clr_reject   = _CLR_REJECT
+    n_scores     = 0 if scores is None else len(scores)
+
     for i, res in enumerate(ocr_results):
         box   = res["box"]  # [x1, y1, x2, y2]
         x1, y1, x2, y2 = box
         text  = res.get("text", "")
         conf  = res.get("confidence", 0.0)
-        score = scores[i] if scores and i < len(scores) else None
+        score = scores[i] if i < n_scores else None
 
         # Choose colour
         if i == matched_idx:
-            color     = _CLR_MATCH
+            color     = clr_match
             thickness = 3
         elif is_short and score is not None and score >= 50:
-            color     = _CLR_CAND
+            color     = clr_cand
             thickness = 2
-        elif score is not None and score is not None and score >= config.FUZZY_MATCH_THRESHOLD:
-            color     = _CLR_GENERAL
+        elif score is not None and score >= thresh:
+            color     = clr_general
             thickness = 1
         else:
-            color     = _CLR_REJECT
+            color     = clr_reject
             thickness = 1
 
-        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, thickness)
+        groups[(color, thickness)].append(_rect_pts(x1, y1, x2, y2))
 
         # Label: text + conf + fuzzy score
         label_parts = [f"{text[:18]}  conf={conf:.2f}"]
@@ -91,10 +140,19 @@ def draw_debug_overlay(
         label = "  ".join(label_parts)
 
         ty = max(y1 - 5, 14)
-        (tw, tlh), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)
-        cv2.rectangle(canvas, (x1, ty - tlh - 3), (x1 + tw + 4, ty + 2), _CLR_TEXT_BG, -1)
-        cv2.putText(canvas, label, (x1 + 2, ty), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1,
-                    cv2.LINE_AA)
+        (tw, tlh), _ = cv2.getTextSize(label, font, 0.4, 1)
+        label_bgs.append(((x1, ty - tlh - 3), (x1 + tw + 4, ty + 2)))
+        labels.append((label, (x1 + 2, ty), color))
+
+    # Label backgrounds go under the outlines so they never hide a
+    # neighbour's box. One filled rectangle each: a single fillPoly over all
+    # of them uses even-odd filling and leaves overlaps hollow.
+    for p1, p2 in label_bgs:
+        cv2.rectangle(canvas, p1, p2, _CLR_TEXT_BG, -1)
+    for (color, thickness), pts in groups.items():
+        cv2.polylines(canvas, pts, True, color, thickness)
+    for label, org, color in labels:
+        cv2.putText(canvas, label, org, font, 0.4, color, 1, cv2.LINE_AA)
 
     # Banner at top
     banner = (f"TARGET: '{target}'  |  {'SHORT' if is_short else 'NORMAL'} mode  |  "
@@ -112,22 +170,46 @@ def save_debug_frame(
     ocr_results: List[Dict[str, Any]],
     target: str,
     matched_idx: Optional[int],
-    scores: Optional[List[float]] = None,
+    scores: Optional[Sequence[float]] = None,
     action_name: str = "click",
 ) -> Optional[Path]:
     """
     Draw and persist a debug overlay image.
     No-ops unless config.SAVE_DEBUG_FRAMES is True.
 
-    Returns the saved path (or None).
+    The file is written asynchronously; the returned path may not exist
+    until the background writer catches up.
+
+    Returns the target path (or None).
     """
-    if not config.SAVE_DEBUG_FRAMES:
+    if not is_debug_enabled():
         return None
 
+    # No `out` buffer here: the image is handed to the background writer.
     annotated = draw_debug_overlay(frame, ocr_results, target, matched_idx, scores, action_name)
     ts         = int(time.time())
     fname      = f"debug_{action_name}_{target[:12].replace(' ','_')}_{ts}.png"
     path       = config.SCREENSHOTS_DIR / fname
-    cv2.imwrite(str(path), annotated)
-    log.debug("Debug overlay saved → %s", path.name)
+
+    # `annotated` is a private copy, so the worker can encode it safely.
+    _IO_SLOTS.acquire()
+    future = _IO_POOL.submit(_encode_and_write, path, annotated)
+    future.add_done_callback(lambda _: _IO_SLOTS.release())
+    log.debug("Debug overlay queued → %s", path.name)
     return path
+
+
+def _encode_and_write(path: Path, image: np.ndarray) -> None:
+    ok, buf = cv2.imencode(".png", image, _PNG_PARAMS)
+    if not ok:
+        log.warning("Debug overlay encode failed for %s", path.name)
+        return
+    try:
+        path.write_bytes(buf.tobytes())
+    except OSError as exc:
+        log.warning("Could not write debug overlay %s: %s", path.name, exc)
+
+
+def _rect_pts(x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+    """Closed rectangle outline as an int32 polygon for polylines."""
+    return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.int32)
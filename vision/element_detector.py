@@ -12,11 +12,33 @@ import numpy as np
 
 import config
 from utils.logger import get_logger
+from vision.ocr_engine import OcrBatch, OcrEngine
+from vision.text_normalizer import normalize
 
 log = get_logger(__name__)
 
+# Numba is optional: when installed the AABB overlap kernel is JIT-compiled.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Canny with apertureSize=5 (L2) vs blur(5x5) + 3x3 Sobel, which the config
+# thresholds are tuned for. Calibrated at full resolution on contour recall:
+# 16 missed 1-px borders the blurred path found; below 12, noise boxes climb.
+_APERTURE5_GAIN = 12
+
+# Dedup grid cells to probe around a box, own cell first (likeliest hit).
+_DEDUP_PROBES = sorted(
+    ((dx, dy, dw) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dw in (-1, 0, 1)),
+    key=lambda d: abs(d[0]) + abs(d[1]) + abs(d[2]),
+)
+
+# Upper bound on boolean cells per broadcast block in the NumPy overlap path.
+_AABB_CHUNK = 1 << 22
+
 Element = dict[str, Any]
-# {"box": [x1,y1,x2,y2], "label": str, "cx": int, "cy": int, "source": str}
+# {"box": np.int32[x1,y1,x2,y2], "label": str, "cx": int, "cy": int, "source": str}
 
 
 class ElementDetector:
@@ -25,6 +47,9 @@ class ElementDetector:
     and annotates them with OCR labels where bounding boxes overlap.
     """
 
+    def __init__(self) -> None:
+        self._annotate_buf: np.ndarray | None = None
+
     def detect_contours(self, image: np.ndarray) -> list[Element]:
         """
         Identify rectangular UI regions through Canny edges → contours.
@@ -36,40 +61,61 @@ class ElementDetector:
             List of Element dicts (label is empty at this stage).
         """
         gray    = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        edges   = cv2.Canny(blurred, config.EDGE_CANNY_LOW, config.EDGE_CANNY_HIGH)
+        f       = max(1, int(config.EDGE_DOWNSCALE))
+        if f == 1:
+            # A 5x5 Sobel aperture smooths implicitly, replacing the separate
+            # GaussianBlur pass; thresholds are rescaled for its larger gain.
+            edges = cv2.Canny(gray,
+                              config.EDGE_CANNY_LOW * _APERTURE5_GAIN,
+                              config.EDGE_CANNY_HIGH * _APERTURE5_GAIN,
+                              apertureSize=5, L2gradient=True)
+        else:
+            # Opt-in 1/f resolution pass. The reduction already low-passes,
+            # so no further blur, and a 1-px border's contrast is spread over
+            # f pixels: thresholds drop by the same factor. Thin borders still
+            # suffer (see config.EDGE_DOWNSCALE).
+            if f == 2:
+                gray = cv2.pyrDown(gray)
+            else:
+                gray = cv2.resize(gray, None, fx=1.0 / f, fy=1.0 / f,
+                                  interpolation=cv2.INTER_AREA)
+            edges = cv2.Canny(gray, config.EDGE_CANNY_LOW / f, config.EDGE_CANNY_HIGH / f)
+        min_area = config.MIN_CONTOUR_AREA / (f * f)
         # Use RETR_LIST to find nested elements (not just the outer window frame)
         contours, _ = cv2.findContours(
             edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
         )
 
         elements: list[Element] = []
+        # Spatial hash of accepted boxes on a 10px grid of (x, y, w) so the
+        # near-duplicate test only probes neighbouring cells, not every box.
+        seen_buckets: dict[tuple[int, int, int], list[tuple[int, int, int]]] = {}
         img_h, img_w = image.shape[:2]
         
-        for cnt in contours:
-            # Approximate the contour to a polygon to check if it is rectangular
-            peri = cv2.arcLength(cnt, True)
-            approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
-            
-            if cv2.contourArea(cnt) < config.MIN_CONTOUR_AREA:
-                continue
-                
-            x, y, w, h = cv2.boundingRect(cnt)
-            
-            # Skip the very large outer window box (usually >= 95% of image size)
-            if w > img_w * 0.95 and h > img_h * 0.95:
-                continue
-                
+        area, rects = _contour_stats(contours)
+        rects *= f
+        keep = area >= min_area
+        # Skip the very large outer window box (usually >= 95% of image size)
+        keep &= ~((rects[:, 2] > img_w * 0.95) & (rects[:, 3] > img_h * 0.95))
+
+        for x, y, w, h in rects[keep].tolist():
             # Deduplicate very similar boxes (avoids double-detecting same box edges)
+            bx, by, bw = x // 10, y // 10, w // 10
             is_dupe = False
-            for existing in elements:
-                ex1, ey1, ex2, ey2 = existing["box"]
-                if abs(x - ex1) < 10 and abs(y - ey1) < 10 and abs(w - (ex2 - ex1)) < 10:
-                    is_dupe = True
+            for dx, dy, dw in _DEDUP_PROBES:
+                bucket = seen_buckets.get((bx + dx, by + dy, bw + dw))
+                if bucket is None:
+                    continue
+                for ex, ey, ew in bucket:
+                    if abs(x - ex) < 10 and abs(y - ey) < 10 and abs(w - ew) < 10:
+                        is_dupe = True
+                        break
+                if is_dupe:
                     break
-            
+
             if not is_dupe:
                 elements.append(_make_element([x, y, x + w, y + h], "", "contour"))
+                seen_buckets.setdefault((bx, by, bw), []).append((x, y, w))
 
         log.debug("Detected %d contour elements.", len(elements))
         return elements
@@ -78,18 +124,22 @@ class ElementDetector:
         """
         Full discovery pipeline: Contours → OCR → Label Merge.
         """
-        from vision.ocr_engine import OcrEngine
-        ocr = OcrEngine()
-        
-        # 1. Geometry discovery
+        ocr = _get_ocr()
+
+        # 1. Text extraction (upscaled for better Citrix button hits), started
+        #    first: it runs on the OCR thread while contours are found here
+        pending  = ocr.submit(ocr.extract_with_scale, image)
+        # 2. Geometry discovery
         contours = self.detect_contours(image)
-        # 2. Text extraction (upscaled for better Citrix button hits)
-        ocr_hits = ocr.extract_with_scale(image)
+        ocr_hits = pending.result()
         # 3. Correlation
         elements = self.merge_with_ocr(contours, ocr_hits)
-        # 4. Canonical sorting
-        elements.sort(key=lambda e: (e['box'][1], e['box'][0]))
-        return elements
+        # 4. Canonical sorting: top-to-bottom, then left-to-right (stable)
+        if not elements:
+            return elements
+        boxes = np.stack([e["box"] for e in elements])
+        order = np.lexsort((boxes[:, 0], boxes[:, 1]))
+        return [elements[i] for i in order]
 
     def merge_with_ocr(
         self,
@@ -99,30 +149,52 @@ class ElementDetector:
         """
         Label contour elements whose boxes overlap with OCR bounding boxes.
         """
-        from vision.text_normalizer import normalize
-        
-        for elem in elements:
-            ex1, ey1, ex2, ey2 = elem["box"]
-            for ocr in ocr_results:
-                ox1, oy1, ox2, oy2 = ocr["box"]
-                # AABB intersection
-                if ox1 < ex2 and ox2 > ex1 and oy1 < ey2 and oy2 > ey1:
-                    txt = normalize(ocr["text"])
-                    sep = " " if elem["label"] else ""
-                    elem["label"] += sep + txt
-
-        seen: set[tuple] = {tuple(e["box"]) for e in elements}
-        for ocr in ocr_results:
-            if tuple(ocr["box"]) not in seen:
-                elements.append(_make_element(ocr["box"], normalize(ocr["text"]), "ocr_only"))
+        if not ocr_results:
+            return elements
+
+        ob = OcrBatch.from_results(ocr_results)
+
+        if elements:
+            E = np.array([e["box"] for e in elements], np.int32).reshape(-1, 4)
+            # Pairs come back element-major, preserving label concatenation order
+            for ei, oi in zip(*_overlap_pairs(E, ob.x1, ob.y1, ob.x2, ob.y2)):
+                elem = elements[ei]
+                txt  = normalize(ob.texts[oi])
+                sep  = " " if elem["label"] else ""
+                elem["label"] += sep + txt
+
+            # Packed int64 keys: one integer compare per box instead of a tuple
+            seen    = _pack_boxes(E[:, 0], E[:, 1], E[:, 2], E[:, 3])
+            orphans = ~np.isin(_pack_boxes(ob.x1, ob.y1, ob.x2, ob.y2), seen)
+        else:
+            orphans = np.ones(len(ob), bool)
+
+        for oi in np.flatnonzero(orphans):
+            elements.append(_make_element(ocr_results[oi]["box"], normalize(ob.texts[oi]), "ocr_only"))
 
         return elements
 
-    def annotate(self, image: np.ndarray, elements: list[Element]) -> np.ndarray:
+    def annotate(
+        self,
+        image: np.ndarray,
+        elements: list[Element],
+        reuse: bool = False,
+    ) -> np.ndarray:
         """
         Generate a visual debug map with boxes and ID labels.
+
+        With reuse=True the map is drawn into a buffer owned by the detector
+        and overwritten on the next reuse call — only for callers that consume
+        the result immediately (e.g. write it to disk).
         """
-        canvas = image.copy()
+        if reuse:
+            buf = self._annotate_buf
+            if buf is None or buf.shape != image.shape or buf.dtype != image.dtype:
+                buf = self._annotate_buf = np.empty_like(image)
+            np.copyto(buf, image)
+            canvas = buf
+        else:
+            canvas = image.copy()
         for i, elem in enumerate(elements):
             box = elem["box"]
             label = elem.get("label", "").strip()
@@ -143,12 +215,99 @@ class ElementDetector:
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+_ocr: OcrEngine | None = None
+
+
+def _get_ocr() -> OcrEngine:
+    """Shared OcrEngine, constructed on first scan() rather than at import."""
+    global _ocr
+    if _ocr is None:
+        _ocr = OcrEngine()
+    return _ocr
+
+
 def _make_element(box: list[int], label: str, source: str) -> Element:
     x1, y1, x2, y2 = box
     return {
-        "box":    box,
+        "box":    np.array(box, np.int32),   # build_screen_state stores it as a list
         "label":  label,
-        "cx":     (x1 + x2) // 2,
-        "cy":     (y1 + y2) // 2,
+        "cx":     int((x1 + x2) // 2),
+        "cy":     int((y1 + y2) // 2),
         "source": source,
     }
+
+
+def _contour_stats(contours) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Batched cv2.contourArea + cv2.boundingRect over a findContours result.
+
+    Returns (area float64[N], rects int64[N, 4] as x, y, w, h), computed with
+    one pass over all contour points instead of two OpenCV calls per contour.
+    """
+    n = len(contours)
+    if n == 0:
+        return np.empty(0), np.empty((0, 4), np.int64)
+
+    lens   = np.fromiter(map(len, contours), np.int64, n)
+    starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    pts    = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    x, y   = pts[:, 0], pts[:, 1]
+
+    # Shoelace formula; each contour's last point closes back to its first.
+    nxt = np.arange(1, len(pts) + 1)
+    nxt[starts + lens - 1] = starts
+    cross = (x * y[nxt] - x[nxt] * y).astype(np.float64)
+    area  = np.abs(np.add.reduceat(cross, starts)) * 0.5
+
+    x0 = np.minimum.reduceat(x, starts)
+    y0 = np.minimum.reduceat(y, starts)
+    rects = np.stack([x0, y0,
+                      np.maximum.reduceat(x, starts) - x0 + 1,
+                      np.maximum.reduceat(y, starts) - y0 + 1], axis=1)
+    return area, rects
+
+
+def _overlap_pairs_loop(E, x1, y1, x2, y2):
+    n, m  = E.shape[0], x1.shape[0]
+    count = 0
+    for i in range(n):
+        for j in range(m):
+            if x1[j] < E[i, 2] and x2[j] > E[i, 0] and y1[j] < E[i, 3] and y2[j] > E[i, 1]:
+                count += 1
+    ei = np.empty(count, np.int64)
+    oi = np.empty(count, np.int64)
+    k  = 0
+    for i in range(n):
+        for j in range(m):
+            if x1[j] < E[i, 2] and x2[j] > E[i, 0] and y1[j] < E[i, 3] and y2[j] > E[i, 1]:
+                ei[k] = i
+                oi[k] = j
+                k += 1
+    return ei, oi
+
+
+def _overlap_pairs_np(E, x1, y1, x2, y2):
+    # Broadcast in row blocks so the (n, m) mask never exceeds _AABB_CHUNK cells.
+    step = max(1, _AABB_CHUNK // max(1, x1.shape[0]))
+    ei_parts, oi_parts = [], []
+    for r in range(0, E.shape[0], step):
+        B = E[r:r + step]
+        mask = ((x1[None, :] < B[:, 2, None]) & (x2[None, :] > B[:, 0, None]) &
+                (y1[None, :] < B[:, 3, None]) & (y2[None, :] > B[:, 1, None]))
+        ei, oi = np.nonzero(mask)
+        ei_parts.append(ei + r)
+        oi_parts.append(oi)
+    return np.concatenate(ei_parts), np.concatenate(oi_parts)
+
+
+# (element idx, ocr idx) index arrays of intersecting boxes, element-major.
+_overlap_pairs = njit(cache=True)(_overlap_pairs_loop) if njit else _overlap_pairs_np
+
+
+def _pack_boxes(x1, y1, x2, y2) -> np.ndarray:
+    """Pack box coordinate columns into one int64 key each (16 bits per coordinate)."""
+    key  = x1.astype(np.int64) & 0xFFFF
+    key |= (y1.astype(np.int64) & 0xFFFF) << 16
+    key |= (x2.astype(np.int64) & 0xFFFF) << 32
+    key |= (y2.astype(np.int64) & 0xFFFF) << 48
+    return key
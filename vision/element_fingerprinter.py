@@ -11,8 +11,12 @@
 """
 from __future__ import annotations
 
+import os
 import sys
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -22,18 +26,103 @@ sys.path.append(str(ROOT))
 import cv2
 import numpy as np
 import config
+from utils.image_utils import content_digest as _digest
 from utils.logger import get_logger
+from vision.ocr_engine import OcrBatch
 
 log = get_logger("ElementFingerprinter")
 
+# Numba is optional: when installed the distance kernels below are JIT-compiled.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+_CONTOUR_CACHE_SIZE = 4     # frames whose contour boxes are kept per fingerprinter
+_FRAME_KEY_STRIDE   = 4     # pixel stride of the sample hashed to key a frame
+_FP_WORKERS         = min(8, os.cpu_count() or 1)  # fingerprint_many() threads
+_REL_SCALE          = 10000 # ElementFingerprint positions are stored in 1/_REL_SCALE units
+_APERTURE5_GAIN_3X3 = 12    # Canny apertureSize=5 gain over blur(3x3) + 3x3 Sobel (cf. element_detector's _APERTURE5_GAIN)
+
 
 # ── Element type heuristics ────────────────────────────────────────────────────
-_BUTTON_RE  = re.compile(r'\b(ok|cancel|yes|no|submit|login|sign in|connect|save|apply|'
-                          r'close|next|back|finish|continue|run|stop|open|search|reset|'
-                          r'add|remove|delete|edit|new|create|confirm|accept|reject)\b', re.I)
-_INPUT_RE   = re.compile(r'\b(username|password|user name|user id|email|'
-                          r'domain|address|host|port|name|search|filter)\b', re.I)
-_CHECKBOX_RE= re.compile(r'^\s*[□✓✗☐☑☒]\s*', re.I)
+_BUTTON_WORDS   = (r'ok|cancel|yes|no|submit|login|sign in|connect|save|apply|'
+                   r'close|next|back|finish|continue|run|stop|open|search|reset|'
+                   r'add|remove|delete|edit|new|create|confirm|accept|reject')
+_INPUT_WORDS    = (r'username|password|user name|user id|email|'
+                   r'domain|address|host|port|name|search|filter')
+_CHECKBOX_CHARS = r'[□✓✗☐☑☒]'
+
+# One anchored pass; alternatives are tried in priority order
+# (checkbox prefix → input word anywhere → button word anywhere) and
+# m.lastgroup names the winning element type.
+_TYPE_RE = re.compile(
+    rf'^(?:(?P<checkbox>\s*{_CHECKBOX_CHARS})'
+    rf'|(?=.*?\b(?P<input_field>{_INPUT_WORDS})\b)'
+    rf'|(?=.*?\b(?P<button>{_BUTTON_WORDS})\b))',
+    re.I | re.S,
+)
+
+
+@lru_cache(maxsize=1024)
+def _text_type(text: str) -> Optional[str]:
+    """Element type implied by the label text alone (UI labels repeat heavily)."""
+    from vision.text_normalizer import normalize
+    m = _TYPE_RE.match(normalize(text))
+    return m.lastgroup if m else None
+
+
+def _to_gray(frame: np.ndarray) -> np.ndarray:
+    """Single-channel view of *frame*; converted once per fingerprint call."""
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+# ── Distance kernels ───────────────────────────────────────────────────────────
+# cx, cy: float64 arrays of box centres. Squared distances are compared in
+# the loop; only the winner is square-rooted by the caller.
+
+def _nearest_idx_loop(cx, cy, rx, ry, max_d2):
+    best_i  = -1
+    best_d2 = max_d2
+    for i in range(cx.shape[0]):
+        d2 = (cx[i] - rx) * (cx[i] - rx) + (cy[i] - ry) * (cy[i] - ry)
+        if d2 < best_d2:
+            best_d2 = d2
+            best_i  = i
+    return best_i, best_d2
+
+
+def _nearest_idx_np(cx, cy, rx, ry, max_d2):
+    if cx.shape[0] == 0:
+        return -1, max_d2
+    d2 = (cx - rx) * (cx - rx) + (cy - ry) * (cy - ry)
+    i  = int(np.argmin(d2))
+    if d2[i] < max_d2:
+        return i, float(d2[i])
+    return -1, max_d2
+
+
+_nearest_idx = njit(cache=True)(_nearest_idx_loop) if njit else _nearest_idx_np
+
+
+class _OcrIndex:
+    """
+    Read-only spatial index over one frame's OCR results, built once per
+    fingerprint_at() call on top of an OcrBatch. Rows are also kept sorted
+    by top edge and by centre-y so helpers can bisect to the few rows that
+    can possibly qualify.
+    """
+    __slots__ = ("ocr", "batch", "texts", "by_y1", "y1_sorted", "by_cy", "cy_sorted")
+
+    def __init__(self, ocr: List[Dict]):
+        b = OcrBatch.from_results(ocr)
+        self.ocr   = ocr
+        self.batch = b
+        self.texts = [t.strip() for t in b.texts]
+        self.by_y1     = np.argsort(b.y1, kind="stable")
+        self.y1_sorted = b.y1[self.by_y1]
+        self.by_cy     = np.argsort(b.cy, kind="stable")
+        self.cy_sorted = b.cy[self.by_cy]
 
 
 class ElementFingerprint:
@@ -43,7 +132,7 @@ class ElementFingerprint:
     """
     __slots__ = (
         "label", "elem_type", "context",
-        "rel_x", "rel_y", "rel_w", "rel_h",
+        "_rel_x", "_rel_y", "_rel_w", "_rel_h",
         "confidence",
     )
 
@@ -61,12 +150,29 @@ class ElementFingerprint:
         self.label      = label.strip()
         self.elem_type  = elem_type
         self.context    = context.strip()
-        self.rel_x      = round(rel_x, 4)
-        self.rel_y      = round(rel_y, 4)
-        self.rel_w      = round(rel_w, 4)
-        self.rel_h      = round(rel_h, 4)
+        # Positions are stored as integers in units of 1/_REL_SCALE.
+        self._rel_x     = round(rel_x * _REL_SCALE)
+        self._rel_y     = round(rel_y * _REL_SCALE)
+        self._rel_w     = round(rel_w * _REL_SCALE)
+        self._rel_h     = round(rel_h * _REL_SCALE)
         self.confidence = round(confidence, 3)
 
+    @property
+    def rel_x(self) -> float:
+        return self._rel_x / _REL_SCALE
+
+    @property
+    def rel_y(self) -> float:
+        return self._rel_y / _REL_SCALE
+
+    @property
+    def rel_w(self) -> float:
+        return self._rel_w / _REL_SCALE
+
+    @property
+    def rel_h(self) -> float:
+        return self._rel_h / _REL_SCALE
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "label":      self.label,
@@ -99,25 +205,77 @@ class ElementFingerprinter:
     for any (x, y) coordinate — even if no text is directly at that point.
     """
 
+    def __init__(self) -> None:
+        # frame key → contour bounding rects (x, y, w, h), LRU-ordered
+        self._contour_cache: "OrderedDict[Tuple, List[Tuple[int, int, int, int]]]" = OrderedDict()
+
     def fingerprint_at(
         self,
         frame:       np.ndarray,
         ocr_results: List[Dict[str, Any]],
         rx:          float,   # relative x (pixels from region left)
         ry:          float,   # relative y (pixels from region top)
+        edges:       Optional[np.ndarray] = None,
     ) -> ElementFingerprint:
         """
         Build the best possible semantic descriptor for the element at (rx, ry).
+
+        *edges* may be a binary edge map of *frame* (see edge_map()) computed
+        once by the caller; otherwise it is derived from the frame on demand.
+        """
+        return self._fingerprint(_to_gray(frame), _OcrIndex(ocr_results), rx, ry, edges)
+
+    def fingerprint_many(
+        self,
+        frame:       np.ndarray,
+        ocr_results: List[Dict[str, Any]],
+        points:      List[Tuple[float, float]],
+        edges:       Optional[np.ndarray] = None,
+    ) -> List[ElementFingerprint]:
+        """
+        fingerprint_at() for many (rx, ry) points on one frame.
+
+        The OCR index, contour rects and an integral image (for O(1) ROI
+        means in _classify_text) are built once and shared read-only across
+        a thread pool; results are returned in *points* order.
         """
-        h_img, w_img = frame.shape[:2]
+        if not points:
+            return []
+        gray  = _to_gray(frame)
+        index = _OcrIndex(ocr_results)
+        rects = self._contour_rects(gray if edges is None else edges,
+                                    is_edges=edges is not None)
+        integral = cv2.integral(gray, sdepth=cv2.CV_64F)
+
+        def run(p: Tuple[float, float]) -> ElementFingerprint:
+            return self._fingerprint(gray, index, p[0], p[1], rects=rects, integral=integral)
+
+        if len(points) == 1:
+            return [run(points[0])]
+        with ThreadPoolExecutor(max_workers=min(_FP_WORKERS, len(points))) as pool:
+            return list(pool.map(run, points))
+
+    # ── Private helpers ──────────────────────────────────────────────────────────
+
+    def _fingerprint(
+        self,
+        gray:  np.ndarray,
+        index: _OcrIndex,
+        rx:    float,
+        ry:    float,
+        edges: Optional[np.ndarray] = None,
+        rects: Optional[List[Tuple[int, int, int, int]]] = None,
+        integral: Optional[np.ndarray] = None,
+    ) -> ElementFingerprint:
+        h_img, w_img = gray.shape[:2]
 
         # 1. Direct hit: text box containing the click point
-        direct = self._find_direct_hit(ocr_results, rx, ry)
+        direct = self._find_direct_hit(index, rx, ry)
 
         if direct:
             label, box = direct
-            elem_type  = self._classify_text(label, frame, box)
-            context    = self._find_context(ocr_results, box, rx, ry, exclude=label)
+            elem_type  = self._classify_text(label, gray, box, integral)
+            context    = self._find_context(index, box, rx, ry, exclude=label)
             rx1, ry1, rx2, ry2 = box
             return ElementFingerprint(
                 label     = label,
@@ -131,11 +289,11 @@ class ElementFingerprinter:
             )
 
         # 2. Nearest neighbour: closest OCR text within 80px
-        nearest = self._find_nearest(ocr_results, rx, ry, max_dist=80)
+        nearest = self._find_nearest(index, rx, ry, max_dist=80)
         if nearest:
             label, box, dist = nearest
-            elem_type = self._classify_text(label, frame, box)
-            context   = self._find_context(ocr_results, box, rx, ry, exclude=label)
+            elem_type = self._classify_text(label, gray, box, integral)
+            context   = self._find_context(index, box, rx, ry, exclude=label)
             rx1, ry1, rx2, ry2 = box
             conf = max(0.5, 1.0 - dist / 160)
             return ElementFingerprint(
@@ -150,10 +308,10 @@ class ElementFingerprinter:
             )
 
         # 3. Visual contour — no text at all (icon / image button)
-        contour = self._find_contour_element(frame, rx, ry)
+        contour = self._find_contour_element(gray, rx, ry, edges, rects)
         if contour:
             x1, y1, x2, y2 = contour
-            ctx = self._find_context_by_pos(ocr_results, (x1+x2)//2, (y1+y2)//2)
+            ctx = self._find_context_by_pos(index, (x1+x2)//2, (y1+y2)//2)
             return ElementFingerprint(
                 label     = "",
                 elem_type = "icon_button",
@@ -177,89 +335,122 @@ class ElementFingerprinter:
             confidence= 0.1,
         )
 
-    # ── Private helpers ──────────────────────────────────────────────────────────
-
     def _find_direct_hit(
         self,
-        ocr: List[Dict],
+        index: _OcrIndex,
         rx: float,
         ry: float,
     ) -> Optional[Tuple[str, List[int]]]:
-        for res in ocr:
-            bx1, by1, bx2, by2 = res["box"]
-            pad = 12
-            if bx1 - pad <= rx <= bx2 + pad and by1 - pad <= ry <= by2 + pad:
-                return res["text"].strip(), res["box"]
-        return None
+        pad = 12
+        b   = index.batch
+        # Only boxes whose top edge is within reach of ry can contain it.
+        k    = np.searchsorted(index.y1_sorted, ry + pad, side="right")
+        cand = index.by_y1[:k]
+        ok   = ((b.x1[cand] - pad <= rx) & (rx <= b.x2[cand] + pad) &
+                (ry <= b.y2[cand] + pad))
+        if not ok.any():
+            return None
+        i = int(cand[ok].min())   # first hit in OCR order, as before
+        return index.texts[i], index.ocr[i]["box"]
 
     def _find_nearest(
         self,
-        ocr: List[Dict],
+        index: _OcrIndex,
         rx: float,
         ry: float,
         max_dist: float,
     ) -> Optional[Tuple[str, List[int], float]]:
-        best_d, best_res = float("inf"), None
-        for res in ocr:
-            bx1, by1, bx2, by2 = res["box"]
-            cx, cy = (bx1 + bx2) / 2, (by1 + by2) / 2
-            d = ((cx - rx) ** 2 + (cy - ry) ** 2) ** 0.5
-            if d < best_d and d <= max_dist:
-                best_d, best_res = d, res
-        if best_res:
-            return best_res["text"].strip(), best_res["box"], best_d
+        # Inclusive max_dist: nudge the strict-< bound by one ulp.
+        max_d2 = np.nextafter(float(max_dist) * max_dist, np.inf)
+        i, d2 = _nearest_idx(index.batch.cx, index.batch.cy, float(rx), float(ry), max_d2)
+        if i >= 0:
+            return index.texts[i], index.ocr[i]["box"], float(d2) ** 0.5
         return None
 
     def _find_contour_element(
         self,
-        frame: np.ndarray,
+        gray:  np.ndarray,
         rx: float,
         ry: float,
+        edges: Optional[np.ndarray] = None,
+        rects: Optional[List[Tuple[int, int, int, int]]] = None,
     ) -> Optional[List[int]]:
         """Find smallest contour box that contains the click point."""
-        gray    = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-        edges   = cv2.Canny(blurred, 30, 100)
-        cnts, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        best_area, best_box = float("inf"), None
-        for cnt in cnts:
-            x, y, w, h = cv2.boundingRect(cnt)
-            area = w * h
-            if area < 100:
-                continue
+        if rects is None:
+            rects = self._contour_rects(gray if edges is None else edges,
+                                        is_edges=edges is not None)
+        # Rects are sorted by area, so the first hit is the smallest.
+        for x, y, w, h in rects:
             if x <= rx <= x + w and y <= ry <= y + h:
-                if area < best_area:
-                    best_area = area
-                    best_box  = [x, y, x + w, y + h]
-        return best_box
+                return [x, y, x + w, y + h]
+        return None
+
+    def _contour_rects(
+        self,
+        image: np.ndarray,
+        is_edges: bool = False,
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        Contour bounding rects for a gray frame (or a ready edge map when
+        *is_edges*), cached by content so repeated fingerprint_at() calls on
+        one screenshot run edge detection once.
+        Rects under 100 px² are dropped; the rest are sorted by ascending area.
+        """
+        sample = np.ascontiguousarray(image[::_FRAME_KEY_STRIDE, ::_FRAME_KEY_STRIDE])
+        key    = (is_edges, image.shape, _digest(sample.data))
+        rects  = self._contour_cache.get(key)
+        if rects is not None:
+            self._contour_cache.move_to_end(key)
+            return rects
+
+        edges   = image if is_edges else self.edge_map(image)
+        cnts, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rects   = [r for r in map(cv2.boundingRect, cnts) if r[2] * r[3] >= 100]
+        rects.sort(key=lambda r: r[2] * r[3])   # stable: ties keep contour order
+
+        self._contour_cache[key] = rects
+        if len(self._contour_cache) > _CONTOUR_CACHE_SIZE:
+            self._contour_cache.popitem(last=False)
+        return rects
+
+    @staticmethod
+    def edge_map(frame: np.ndarray) -> np.ndarray:
+        """Binary edge map (BGR or gray input) used for contour fallback; shareable across calls."""
+        gray = _to_gray(frame)
+        # 5x5 Sobel aperture replaces the 3x3 pre-blur; thresholds 30/100
+        # rescaled by the aperture's measured gain.
+        return cv2.Canny(gray, 30 * _APERTURE5_GAIN_3X3, 100 * _APERTURE5_GAIN_3X3,
+                         apertureSize=5, L2gradient=True)
 
     def _classify_text(
         self,
         text: str,
-        frame: np.ndarray,
+        gray: np.ndarray,
         box: List[int],
+        integral: Optional[np.ndarray] = None,
     ) -> str:
         """
         Classify the element type from text patterns and visual cues.
         This mirrors Tosca's control-type classification.
+        *integral* is cv2.integral(gray) when the caller has one for this frame.
         """
-        from vision.text_normalizer import normalize
-        norm = normalize(text)
-        
-        if _CHECKBOX_RE.match(norm):
-            return "checkbox"
-        if _INPUT_RE.search(norm):
-            return "input_field"
-        if _BUTTON_RE.search(norm):
-            return "button"
-
-        # Visual cue: sample background colour inside box for button-like appearance
+        elem_type = _text_type(text)
+        if elem_type:
+            return elem_type
+
+        # Visual cue: sample background brightness inside box for button-like appearance
         try:
+            h, w = gray.shape[:2]
             x1, y1, x2, y2 = box
-            roi = frame[max(0,y1):y2, max(0,x1):x2]
-            if roi.size > 0:
-                mean_val = roi.mean()
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(x2, w), min(y2, h)
+            if x2 > x1 and y2 > y1:
+                if integral is None:
+                    mean_val = gray[y1:y2, x1:x2].mean()
+                else:
+                    # Four corner lookups instead of an O(area) reduction
+                    total = (integral[y2, x2] - integral[y1, x2]
+                             - integral[y2, x1] + integral[y1, x1])
+                    mean_val = total / ((y2 - y1) * (x2 - x1))
                 if mean_val > 180:      # Light background → likely a button
                     return "button"
                 elif mean_val < 50:     # Dark → text label on dark bg
@@ -271,7 +462,7 @@ class ElementFingerprinter:
 
     def _find_context(
         self,
-        ocr: List[Dict],
+        index: _OcrIndex,
         box: List[int],
         rx: float,
         ry: float,
@@ -282,36 +473,30 @@ class ElementFingerprinter:
         Mirrors how Tosca finds form-field labels.
         """
         bx1, by1, bx2, by2 = box
-        candidates = []
-
-        for res in ocr:
-            t = res["text"].strip()
-            if not t or t == exclude:
-                continue
-            rx1, ry1, rx2, ry2 = res["box"]
-            cx, cy = (rx1 + rx2) / 2, (ry1 + ry2) / 2
-
-            # Above: within x-range and above our box
-            if rx1 < bx2 and rx2 > bx1 and cy < by1:
-                dist = by1 - cy
-                candidates.append((dist, t))
-            # To the left: same y-band, left of box
-            elif cy > by1 and cy < by2 and cx < bx1:
-                dist = bx1 - cx
-                candidates.append((dist, t))
+        b = index.batch
+
+        # Above: centre above our box and overlapping its x-range
+        above = index.by_cy[:np.searchsorted(index.cy_sorted, by1, side="left")]
+        above = above[(b.x1[above] < bx2) & (b.x2[above] > bx1)]
+        # To the left: centre inside our y-band, left of box
+        lo, hi = (np.searchsorted(index.cy_sorted, by1, side="right"),
+                  np.searchsorted(index.cy_sorted, by2, side="left"))
+        left = index.by_cy[lo:hi]
+        left = left[b.cx[left] < bx1]
+
+        candidates = [(by1 - b.cy[i], index.texts[i]) for i in above]
+        candidates += [(bx1 - b.cx[i], index.texts[i]) for i in left]
+        candidates = [(d, t) for d, t in candidates if t and t != exclude]
 
         if candidates:
-            candidates.sort()
-            return candidates[0][1]
+            return min(candidates)[1]
         return ""
 
-    def _find_context_by_pos(self, ocr: List[Dict], cx: float, cy: float) -> str:
-        best_d, ctx = float("inf"), ""
-        for res in ocr:
-            bx1, by1, bx2, by2 = res["box"]
-            ecx, ecy = (bx1 + bx2) / 2, (by1 + by2) / 2
-            d = ((ecx - cx) ** 2 + (ecy - cy) ** 2) ** 0.5
-            if d < best_d:
-                best_d = d
-                ctx    = res["text"].strip()
-        return ctx
+    def _find_context_by_pos(
+        self,
+        index: _OcrIndex,
+        cx: float,
+        cy: float,
+    ) -> str:
+        i, _ = _nearest_idx(index.batch.cx, index.batch.cy, float(cx), float(cy), np.inf)
+        return index.texts[i] if i >= 0 else ""
@@ -20,6 +20,7 @@ from __future__ import annotations
 import logging
 import time
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
@@ -27,19 +28,131 @@ import numpy as np
 from rapidfuzz import fuzz, process
 
 import config
-from vision.text_normalizer import normalize, normalized_pairs
+from vision.text_normalizer import normalize, normalize_ocr
 from vision.click_memory    import ClickMemory
+from vision.ocr_engine      import OcrEngine
 from vision.template_matcher import TemplateMatcher
-from vision.debug_overlay    import save_debug_frame
+from vision.debug_overlay    import is_debug_enabled, save_debug_frame
 from utils.image_utils       import crop_region
 
 log = logging.getLogger("MatchEngine")
 
+# Numba is optional: when installed the score blend + argmax is JIT-compiled.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # ── Tuning ────────────────────────────────────────────────────────────────────
 _NORMAL_THRESHOLD = config.FUZZY_MATCH_THRESHOLD   # default 75
 _SHORT_THRESHOLD  = 60    # ≤3 char targets
 _SHORT_MAX_LEN    = 3
 _REGION_EXPAND_PX = 40    # pixels to expand region when target box escapes
+_PRUNE_MIN        = 32    # candidate count above which _score_best prunes by bound
+
+
+# ── Score kernels ─────────────────────────────────────────────────────────────
+# tok / part / rat: float64 rows from rapidfuzz cdist, one entry per candidate.
+# Scores are rounded to 2 dp exactly as np.round does (rint(x * 100) / 100).
+# They stay float: the ratio scorers return fractional values, and integer
+# (uint8) cdist output would round each one first and reorder near-ties.
+
+def _blend(tok, part, rat, is_short):
+    if is_short:
+        # Short targets: partial_ratio dominant, ratio as tiebreak;
+        # allow a pure-partial win
+        scores = np.maximum(tok * 0.4 + part * 0.5 + rat * 0.1, part)
+    else:
+        scores = tok * 0.6 + part * 0.3 + rat * 0.1
+    return np.rint(scores * 100.0) / 100.0
+
+
+def _blend_best_loop(tok, part, rat, is_short):
+    # Fused blend + argmax: no per-candidate temporaries, first maximum wins.
+    best_i, best = -1, -1.0
+    for i in range(tok.shape[0]):
+        if is_short:
+            s = max(tok[i] * 0.4 + part[i] * 0.5 + rat[i] * 0.1, part[i])
+        else:
+            s = tok[i] * 0.6 + part[i] * 0.3 + rat[i] * 0.1
+        s = np.rint(s * 100.0) / 100.0
+        if s > best:
+            best_i, best = i, s
+    return best_i, best
+
+
+def _blend_best_np(tok, part, rat, is_short):
+    if tok.shape[0] == 0:
+        return -1, -1.0
+    scores = _blend(tok, part, rat, is_short)
+    i = int(scores.argmax())
+    return i, float(scores[i])
+
+
+_blend_best = njit(cache=True)(_blend_best_loop) if njit else _blend_best_np
+
+
+def _scorer_matrix(queries: List[str], candidates: List[str]):
+    """(token_set, partial, ratio) float64[len(queries), len(candidates)] score matrices."""
+    return (
+        process.cdist(queries, candidates, scorer=fuzz.token_set_ratio, dtype=np.float64),
+        process.cdist(queries, candidates, scorer=fuzz.partial_ratio,   dtype=np.float64),
+        process.cdist(queries, candidates, scorer=fuzz.ratio,           dtype=np.float64),
+    )
+
+
+def _scorer_rows(norm_target: str, candidates: List[str]):
+    """(token_set, partial, ratio) score rows: one native cdist call per scorer."""
+    return tuple(m[0] for m in _scorer_matrix([norm_target], candidates))
+
+
+def _first_substring_hit(norm_target: str, candidates: List[str]) -> int:
+    """
+    Index of the first candidate a short target blends to 100 with, or -1
+    if no candidate contains the target.
+
+    A contained target gives partial_ratio == 100, and a short-target blend
+    with partial at 100 is exactly 100 — the maximum — so the first such
+    candidate wins, unless an earlier one also reaches partial 100 (e.g.
+    it is itself contained in the target); only that prefix is scored.
+    """
+    if not norm_target:
+        return -1
+    first = next((i for i, c in enumerate(candidates) if norm_target in c), -1)
+    if first > 0:
+        row     = process.cdist([norm_target], candidates[:first], scorer=fuzz.partial_ratio,
+                                dtype=np.float64, score_cutoff=100)[0]
+        earlier = np.flatnonzero(row >= 100)
+        if earlier.size:
+            return int(earlier[0])
+    return first
+
+
+def _blend_kept(norm_target: str, candidates: List[str], keep, first_row, is_short):
+    """_blend_best over candidates[keep]; *first_row* holds their first-scorer scores."""
+    sub   = [candidates[i] for i in keep]
+    query = [norm_target]
+    if is_short:
+        part = first_row[keep]
+        tok  = process.cdist(query, sub, scorer=fuzz.token_set_ratio, dtype=np.float64)[0]
+    else:
+        tok  = first_row[keep]
+        part = process.cdist(query, sub, scorer=fuzz.partial_ratio, dtype=np.float64)[0]
+    rat = process.cdist(query, sub, scorer=fuzz.ratio, dtype=np.float64)[0]
+    return _blend_best(tok, part, rat, is_short)
+
+
+@lru_cache(maxsize=1)
+def _screen_bounds() -> Optional[Tuple[int, int, int, int]]:
+    """(left, top, right, bottom) of the whole virtual screen, or None if unknown."""
+    try:
+        import mss
+        with mss.mss() as sct:
+            mon = sct.monitors[0]
+    except Exception as exc:
+        log.debug("Screen bounds unavailable: %s", exc)
+        return None
+    return mon["left"], mon["top"], mon["left"] + mon["width"], mon["top"] + mon["height"]
 
 
 # ── Result container ──────────────────────────────────────────────────────────
@@ -81,6 +194,14 @@ class MatchEngine:
         self.context_id    = context_id
         self._memory       = ClickMemory(region)
         self._template     = TemplateMatcher()
+        self._ocr_engine: Optional[OcrEngine] = None   # bound on first expanded search
+        if njit:
+            # Compile (or load from cache) now rather than on the first lookup
+            one = np.zeros(1)
+            _blend_best(one, one, one, True)
+            _blend_best(one, one, one, False)
+        # (OCR texts, their 'norm' strings) from the last lookup
+        self._enriched_cache: Optional[Tuple[Tuple[str, ...], List[str]]] = None
 
     # ── Public API ──────────────────────────────────────────────────────────────
 
@@ -103,6 +224,43 @@ class MatchEngine:
         Returns:
             MatchResult — check .found before using .cx/.cy.
         """
+        return self._resolve(target, ocr_results, frame, action_name)
+
+    def match_targets(
+        self,
+        targets:     List[str],
+        ocr_results: List[Dict[str, Any]],
+        frame:       np.ndarray,
+        action_name: str = "click",
+    ) -> List[MatchResult]:
+        """
+        Resolve several targets against the same OCR frame.
+
+        Equivalent to calling match_target() for each target, but every
+        target is fuzzy-scored against the candidates in one many-to-many
+        cdist call per scorer instead of one call per target.
+        """
+        if not targets:
+            return []
+        _, candidates = self._normalized(ocr_results)
+        if not candidates:
+            return [self._resolve(t, ocr_results, frame, action_name) for t in targets]
+
+        tok, part, rat = _scorer_matrix([normalize(t) for t in targets], candidates)
+        return [
+            self._resolve(t, ocr_results, frame, action_name, rows=(tok[i], part[i], rat[i]))
+            for i, t in enumerate(targets)
+        ]
+
+    def _resolve(
+        self,
+        target:      str,
+        ocr_results: List[Dict[str, Any]],
+        frame:       np.ndarray,
+        action_name: str,
+        rows:        Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    ) -> MatchResult:
+        """match_target() body; *rows* are this target's precomputed scorer rows."""
         norm_target  = normalize(target)
         is_short     = len(norm_target.replace(" ", "")) <= _SHORT_MAX_LEN
         threshold    = _SHORT_THRESHOLD if is_short else _NORMAL_THRESHOLD
@@ -124,34 +282,34 @@ class MatchEngine:
                 self._memory.invalidate(target, self.region)
 
         # ── ② Normalize OCR → build candidate list ──────────────────────────
-        enriched, norm_target = normalized_pairs(ocr_results, target)
-        candidates  = [e["norm"] for e in enriched]
-        raw_labels  = [e.get("text", "") for e in enriched]
-
-        scores = self._multi_score(norm_target, candidates, is_short)
-
-        if config.SAVE_DEBUG_FRAMES:
-            save_debug_frame(frame, ocr_results, target, None, scores, action_name)
+        enriched, candidates = self._normalized(ocr_results)
 
         # ── ③ OCR fuzzy match ────────────────────────────────────────────────
-        best_idx, best_score = self._pick_best(
-            norm_target, candidates, scores, is_short, threshold
-        )
+        if is_debug_enabled():
+            # Debug overlays need every candidate's score. One frame per
+            # lookup: both outcomes share the same per-second filename.
+            scores = self._multi_score(norm_target, candidates, is_short, rows)
+            best_idx, best_score = self._pick_best(
+                norm_target, candidates, scores, is_short, threshold
+            )
+            save_debug_frame(frame, ocr_results, target,
+                             best_idx if best_idx >= 0 else None, scores, action_name)
+        else:
+            best_idx, best_score = self._score_best(
+                norm_target, candidates, is_short, threshold, rows
+            )
 
         if best_idx >= 0:
             elem  = enriched[best_idx]
             box   = elem["box"]
             cx    = (box[0] + box[2]) // 2
             cy    = (box[1] + box[3]) // 2
-            label = raw_labels[best_idx]
+            label = elem.get("text", "")
 
             # ⑥ Region boundary validation
             cx, cy, expanded = self._validate_bounds(cx, cy, box)
             result.tried_expand = expanded
 
-            if config.SAVE_DEBUG_FRAMES:
-                save_debug_frame(frame, ocr_results, target, best_idx, scores, action_name)
-
             result.found   = True
             result.cx, result.cy = cx + self._ox(), cy + self._oy()
             result.method  = "ocr"
@@ -213,47 +371,75 @@ class MatchEngine:
         norm_target: str,
         candidates: List[str],
         is_short: bool,
-    ) -> List[float]:
+        rows: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    ) -> np.ndarray:
         """
-        Compute a blended fuzzy score for each candidate.
+        Compute a blended fuzzy score (float64, 2 dp) for each candidate.
 
         For short targets, partial_ratio gets extra weight to handle
         single-word matches inside longer strings ("Cancel Button" vs "OK").
+        *rows* skips the cdist calls when match_targets() already scored them.
         """
         if not candidates:
-            return []
+            return np.empty(0)
+        if rows is not None:
+            return _blend(*rows, is_short)
+        if is_short and norm_target:
+            # Substring hits blend to exactly 100; only score the others
+            scores = np.full(len(candidates), 100.0)
+            rest   = [i for i, c in enumerate(candidates) if norm_target not in c]
+            if rest:
+                scores[rest] = _blend(*_scorer_rows(norm_target, [candidates[i] for i in rest]), True)
+            return scores
+        return _blend(*_scorer_rows(norm_target, candidates), is_short)
 
-        scores = []
-        for cand in candidates:
-            tok  = float(fuzz.token_set_ratio(norm_target, cand))
-            part = float(fuzz.partial_ratio(norm_target, cand))
-            rat  = float(fuzz.ratio(norm_target, cand))
+    def _pick_best(
+        self,
+        norm_target: str,
+        candidates:  List[str],
+        scores:      np.ndarray,
+        is_short:    bool,
+        threshold:   float,
+    ) -> Tuple[int, float]:
+        """Return (index, score) of best candidate, or (-1, 0) if none pass."""
+        if scores.size == 0:
+            return -1, 0.0
 
-            if is_short:
-                # Short targets: partial_ratio dominant, ratio as tiebreak
-                score = max(tok * 0.4 + part * 0.5 + rat * 0.1,
-                            part)          # allow pure-partial win
-            else:
-                score = tok * 0.6 + part * 0.3 + rat * 0.1
+        best_idx   = int(scores.argmax())
+        best_score = float(scores[best_idx])
 
-            scores.append(round(score, 2))
+        if best_score < threshold:
+            log.debug("Best fuzzy score %.1f < threshold %.1f for '%s'",
+                      best_score, threshold, norm_target)
+            return -1, 0.0
 
-        return scores
+        return best_idx, best_score
 
-    def _pick_best(
+    def _score_best(
         self,
         norm_target: str,
         candidates:  List[str],
-        scores:      List[float],
         is_short:    bool,
         threshold:   float,
+        rows:        Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
     ) -> Tuple[int, float]:
-        """Return (index, score) of best candidate, or (-1, 0) if none pass."""
-        if not scores:
+        """
+        _multi_score + _pick_best in one fused pass, for when the per-candidate
+        scores are not needed (debug overlays off).
+        """
+        if not candidates:
             return -1, 0.0
 
-        best_idx   = int(np.argmax(scores))
-        best_score = scores[best_idx]
+        hit = _first_substring_hit(norm_target, candidates) if is_short and rows is None else -1
+        if rows is not None:
+            best_idx, best_score = _blend_best(*rows, is_short)
+        elif hit >= 0:
+            best_idx, best_score = hit, 100.0
+        elif len(candidates) > _PRUNE_MIN:
+            best_idx, best_score = self._score_best_pruned(norm_target, candidates, is_short, threshold)
+        else:
+            best_idx, best_score = _blend_best(*_scorer_rows(norm_target, candidates), is_short)
+        best_idx, best_score = int(best_idx), float(best_score)
 
         if best_score < threshold:
             log.debug("Best fuzzy score %.1f < threshold %.1f for '%s'",
@@ -262,6 +448,68 @@ class MatchEngine:
 
         return best_idx, best_score
 
+    @staticmethod
+    def _score_best_pruned(
+        norm_target: str,
+        candidates:  List[str],
+        is_short:    bool,
+        threshold:   float,
+    ) -> Tuple[int, float]:
+        """
+        Exact _blend_best for long candidate lists: score one scorer first and
+        only run the other two on candidates that can still win.
+
+        With the other scorers at their 100 maximum, a blended score can only
+        reach L if token_set >= (L - 40) / 0.6 (normal), or partial >=
+        min(2 * (L - 50), L) (short). L starts at *threshold*: if nobody
+        passes the result is (-1, ...) either way. Candidates saturated on
+        the first scorer (== 100) are blended first, and their best score
+        raises L, since nothing below it can take the win.
+        """
+        def cutoff(floor: float) -> float:
+            c = min(2 * (floor - 50), floor) if is_short else (floor - 40) / 0.6
+            return max(0.0, c - 1e-6)
+
+        t     = threshold - 0.01      # blended scores are rounded to 2 dp
+        first = fuzz.partial_ratio if is_short else fuzz.token_set_ratio
+        c     = cutoff(t)
+        row   = process.cdist([norm_target], candidates, scorer=first,
+                              dtype=np.float64, score_cutoff=c)[0]
+        keep  = np.flatnonzero(row >= c) if c > 0 else np.arange(len(candidates))
+        if keep.size == 0:
+            return -1, 0.0
+
+        sat = keep[row[keep] >= 100.0]
+        if 0 < sat.size < keep.size:
+            i, best = _blend_kept(norm_target, candidates, sat, row, is_short)
+            if best - 0.01 > t:
+                keep = keep[row[keep] >= cutoff(best - 0.01)]
+                if keep.size == sat.size:     # only the saturated set is left
+                    return int(sat[i]), best
+
+        i, score = _blend_kept(norm_target, candidates, keep, row, is_short)
+        return (int(keep[i]), score) if i >= 0 else (-1, 0.0)
+
+    def _normalized(
+        self,
+        ocr_results: List[Dict[str, Any]],
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        (normalize_ocr() copy, list of 'norm' strings). The strings are
+        memoized on a snapshot of the OCR texts, so several targets resolved
+        against one frame build the rapidfuzz choice list once, and a list
+        edited in place is never answered from a stale cache. The per-call
+        copy is rebuilt, so it always carries the current boxes.
+        """
+        texts  = tuple(r.get("text", "") for r in ocr_results)
+        cached = self._enriched_cache
+        if cached is None or cached[0] != texts:
+            cached = (texts, [normalize(t) for t in texts])
+            self._enriched_cache = cached
+        candidates = cached[1]
+        enriched   = [dict(r, norm=n) for r, n in zip(ocr_results, candidates)]
+        return enriched, candidates
+
     def _within_region(self, cx: int, cy: int, absolute: bool = False) -> bool:
         """Check if a screen point is within the automation region."""
         if not self.region:
@@ -305,39 +553,61 @@ class MatchEngine:
         target: str,
     ) -> Optional[Tuple[int, int]]:
         """
-        Re-run OCR on a slightly padded version of the frame.
-        Returns (cx, cy) region-relative if found, else None.
-        Avoids circular import by importing OcrEngine locally.
+        Re-run OCR on the frame padded by _REGION_EXPAND_PX, so text cut by
+        the region border can still be detected.
+        Returns (cx, cy) in screen coordinates if found, else None.
         """
         try:
-            from vision.ocr_engine import OcrEngine
-            pad  = _REGION_EXPAND_PX
-            padded = cv2.copyMakeBorder(frame, pad, pad, pad, pad, cv2.BORDER_REPLICATE)
-            ocr  = OcrEngine()
-            results = ocr.extract(padded)
+            t, b, l, r = self._expand_padding(frame)
+            if not (t or b or l or r):
+                # Unpadded, this is the main pass again, which already failed
+                return None
+            padded = cv2.copyMakeBorder(frame, t, b, l, r, cv2.BORDER_CONSTANT)
+            if self._ocr_engine is None:
+                self._ocr_engine = OcrEngine()
+            results = self._ocr_engine.extract(padded)
             if not results:
                 return None
             norm_tgt = normalize(target)
             is_short = len(norm_tgt.replace(" ", "")) <= _SHORT_MAX_LEN
             thresh   = _SHORT_THRESHOLD if is_short else _NORMAL_THRESHOLD
 
-            enriched, norm_target = normalized_pairs(results, target)
+            enriched   = normalize_ocr(results)
             candidates = [e["norm"] for e in enriched]
-            scores = self._multi_score(norm_target, candidates, is_short)
-            idx, score = self._pick_best(norm_target, candidates, scores, is_short, thresh)
+            idx, score = self._score_best(norm_tgt, candidates, is_short, thresh)
 
             if idx < 0:
                 return None
 
             box = enriched[idx]["box"]
-            cx  = (box[0] + box[2]) // 2 - pad + self._ox()
-            cy  = (box[1] + box[3]) // 2 - pad + self._oy()
+            cx  = (box[0] + box[2]) // 2 - l + self._ox()
+            cy  = (box[1] + box[3]) // 2 - t + self._oy()
             return cx, cy
 
         except Exception as exc:
             log.warning("Expanded OCR failed: %s", exc)
             return None
 
+    def _expand_padding(self, frame: np.ndarray) -> Tuple[int, int, int, int]:
+        """
+        (top, bottom, left, right) padding for the expanded search. Sides
+        where the region already touches the screen edge get none: nothing
+        can be clipped there. Without a region the frame is the whole screen.
+        """
+        if not self.region:
+            return 0, 0, 0, 0
+        pad    = _REGION_EXPAND_PX
+        bounds = _screen_bounds()
+        if bounds is None:
+            return pad, pad, pad, pad
+        h, w = frame.shape[:2]
+        x0, y0 = self._ox(), self._oy()
+        sl, st, sr, sb = bounds
+        return (0 if y0 <= st else pad,
+                0 if y0 + h >= sb else pad,
+                0 if x0 <= sl else pad,
+                0 if x0 + w >= sr else pad)
+
     def _ox(self) -> int:
         return int(self.region.get("left", 0))
 
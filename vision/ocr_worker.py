@@ -0,0 +1,162 @@
+"""
+╔══════════════════════════════════════════════════════════════════════╗
+║  OcrWorker — PaddleOCR in a persistent worker process               ║
+║                                                                      ║
+║  Drop-in for the PaddleOCR object held by OcrEngine (same .ocr()    ║
+║  call), enabled with config.OCR_SUBPROCESS. Inference then runs     ║
+║  outside the automation process, so capture / matching threads     ║
+║  keep the interpreter while a frame is being read.                  ║
+║                                                                      ║
+║  Transport: the frame is copied into a reused SharedMemory block;   ║
+║  only (block name, shape, dtype) and the parsed result cross the    ║
+║  pipe — the image itself is never pickled.                          ║
+╚══════════════════════════════════════════════════════════════════════╝
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+import numpy as np
+
+import config
+
+log = logging.getLogger("OcrWorker")
+
+
+class OcrWorker:
+    """
+    Owns one daemon worker process holding a PaddleOCR model.
+    Thread-safe: concurrent calls are serialized over the single pipe.
+    A worker that timed out or died is replaced on the next call.
+    """
+
+    def __init__(self, timeout: float = config.OCR_WORKER_TIMEOUT_SEC) -> None:
+        self._timeout = timeout
+        self._lock    = threading.Lock()
+        self._closed  = False
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+        # Model load failure surfaces here, so OcrEngine falls back exactly
+        # as for an in-process init error.
+        self._start()
+        atexit.register(self.close)
+
+    def ocr(self, image: np.ndarray) -> Any:
+        """Run PaddleOCR on *image* in the worker; returns its raw output."""
+        image = np.ascontiguousarray(image)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("OCR worker is closed")
+            if not self._proc.is_alive():
+                log.warning("OCR worker (pid=%s) is gone (exit code %s); restarting it.",
+                            self._proc.pid, self._proc.exitcode)
+                self._conn.close()
+                self._start()
+            shm = self._buffer(image.nbytes)
+            np.ndarray(image.shape, image.dtype, buffer=shm.buf)[...] = image
+            self._conn.send((shm.name, image.shape, image.dtype.str))
+            status, payload = self._recv(self._timeout)
+        if status != "ok":
+            raise RuntimeError(f"OCR worker error: {payload}")
+        return payload
+
+    def close(self) -> None:
+        """Stop the worker and release the shared frame buffer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._proc.is_alive():
+                try:
+                    self._conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                self._proc.join(timeout=5)
+                if self._proc.is_alive():
+                    self._proc.terminate()
+            self._conn.close()
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+    # ── Private ────────────────────────────────────────────────────────────────
+
+    def _start(self) -> None:
+        """Spawn a worker and wait until its model has loaded."""
+        ctx = mp.get_context("spawn")   # never fork a process holding GUI/capture handles
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=_serve, args=(child,), name="ocr-worker", daemon=True)
+        self._proc.start()
+        child.close()
+
+        status, payload = self._recv(timeout=None)
+        if status != "ready":
+            self._proc.join(timeout=5)
+            raise RuntimeError(f"OCR worker failed to start: {payload}")
+        log.info("OCR worker started (pid=%s).", self._proc.pid)
+
+    def _buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        """Shared frame block, reallocated only when a larger frame arrives."""
+        if self._shm is None or self._shm.size < nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        return self._shm
+
+    def _recv(self, timeout: Optional[float]) -> Any:
+        if not self._conn.poll(timeout):
+            # Reaped here so the next ocr() sees it dead and starts a new one
+            self._proc.terminate()
+            self._proc.join(timeout=5)
+            raise TimeoutError(f"OCR worker did not answer within {timeout}s")
+        try:
+            return self._conn.recv()
+        except EOFError:
+            self._proc.join(timeout=5)
+            raise RuntimeError("OCR worker exited unexpectedly") from None
+
+
+# ── Worker process ────────────────────────────────────────────────────────────
+
+def _serve(conn) -> None:
+    """Worker entry point: build the model, then answer one frame per message."""
+    try:
+        from vision.ocr_engine import _build_paddle
+        model = _build_paddle()
+    except Exception as exc:
+        conn.send(("error", repr(exc)))
+        return
+    conn.send(("ready", None))
+
+    shm: Optional[shared_memory.SharedMemory] = None
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg is None:
+                break
+            name, shape, dtype = msg
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                # Spawned children share the parent's resource tracker, which
+                # keeps owning (and unlinking) the block.
+                shm = shared_memory.SharedMemory(name=name)
+            # Copy out so the parent may reuse the block as soon as we reply
+            image = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf).copy()
+            try:
+                conn.send(("ok", model.ocr(image)))
+            except Exception as exc:
+                conn.send(("error", repr(exc)))
+    finally:
+        if shm is not None:
+            shm.close()
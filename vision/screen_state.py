@@ -36,7 +36,8 @@ def build_screen_state(
     Args:
         image:       BGR frame used for hashing.
         ocr_results: Output of OcrEngine.extract().
-        elements:    Output of ElementDetector (after merge_with_ocr).
+        elements:    Output of ElementDetector (after merge_with_ocr); their
+                     int32 box arrays are stored as plain lists.
         step:        Current agent step counter.
 
     Returns:
@@ -51,7 +52,7 @@ def build_screen_state(
         "timestamp":     time.strftime("%Y-%m-%dT%H:%M:%S"),
         "step":          step,
         "visible_texts": visible_texts,
-        "elements":      elements,
+        "elements":      [_plain_element(e) for e in elements],
     }
 
     log.debug(
@@ -61,6 +62,14 @@ def build_screen_state(
     return state
 
 
+def _plain_element(element: dict) -> dict:
+    """Copy of *element* with a numpy box converted to a JSON-ready list."""
+    box = element.get("box")
+    if isinstance(box, np.ndarray):
+        return {**element, "box": box.tolist()}
+    return element
+
+
 def state_to_json(state: ScreenState) -> str:
     """Serialise a ScreenState to an indented JSON string."""
     return json.dumps(state, indent=2)
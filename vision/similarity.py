@@ -5,6 +5,7 @@ Centralises all fuzzy-matching logic so the planner stays clean.
 
 from __future__ import annotations
 
+import numpy as np
 from rapidfuzz import fuzz, process
 
 import config
@@ -12,6 +13,13 @@ from utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# cdist only spreads work over threads from this many query×candidate pairs;
+# below it thread start-up costs more than the scoring it would split.
+_PARALLEL_PAIRS = 10_000
+
+# Characters str.split() treats as whitespace but RapidFuzz's tokenizer does not.
+_NON_RF_SPACE = ("\x85", "\xa0")
+
 
 def best_match(
     query: str,
@@ -54,6 +62,107 @@ def best_match(
     return None
 
 
+def best_matches_batch(
+    queries: list[str],
+    candidates: list[str],
+    threshold: float | None = None,
+) -> list[tuple[str, float] | None]:
+    """
+    :func:`best_match` for many queries against one candidate list.
+
+    Scores the whole query×candidate matrix in a single
+    ``process.cdist`` call instead of one ``extractOne`` per query.
+    Ties resolve to the earliest candidate, as in :func:`best_match`.
+
+    Args:
+        queries:    Strings to look up (e.g. every goal keyword).
+        candidates: List of strings to search (e.g. visible_texts).
+        threshold:  Minimum score (0–100) to consider a match.
+                    Defaults to config.FUZZY_MATCH_THRESHOLD.
+
+    Returns:
+        One entry per query: (matched_string, score) or None.
+    """
+    hits = _best_indices(queries, candidates, threshold)
+    return [(candidates[hit[0]], hit[1]) if hit else None for hit in hits]
+
+
+def _best_indices(
+    queries: list[str],
+    candidates: list[str],
+    threshold: float | None,
+) -> list[tuple[int, float] | None]:
+    """(candidate index, score) of each query's best match above threshold."""
+    thr = threshold if threshold is not None else config.FUZZY_MATCH_THRESHOLD
+
+    if not candidates or not queries:
+        return [None] * len(queries)
+
+    scores = process.cdist(
+        queries,
+        candidates,
+        scorer=fuzz.token_set_ratio,
+        dtype=np.float64,
+        workers=-1 if len(queries) * len(candidates) >= _PARALLEL_PAIRS else 1,
+    )
+    best = scores.argmax(axis=1).tolist()
+
+    out: list[tuple[int, float] | None] = []
+    for query, row, idx in zip(queries, scores, best):
+        score = float(row[idx])
+        if query and score >= thr:
+            out.append((idx, score))
+        else:
+            out.append(None)
+    log.debug("Fuzzy batch: %d/%d queries matched", sum(m is not None for m in out), len(out))
+    return out
+
+
+class TokenSetIndex:
+    """
+    A candidate list prepared for repeated token_set_ratio lookups.
+
+    token_set_ratio only sees each candidate's set of tokens, so candidates
+    with the same set always score the same. The index keeps one sorted
+    key per distinct set and scores only those. OCR screens repeat labels
+    a lot ("OK", "Cancel", "Close" on every dialog), so several goals
+    searched against one ``visible_texts`` list do much less scoring.
+    Results are identical to :func:`best_match` / :func:`best_matches_batch`.
+    """
+
+    def __init__(self, candidates: list[str]) -> None:
+        self.candidates = list(candidates)
+        self._keys:  list[str] = []     # distinct token sets, first-seen order
+        self._first: list[int] = []     # candidate index of each key's first use
+        seen: set[str] = set()
+        for i, text in enumerate(self.candidates):
+            key = text
+            if not any(ch in text for ch in _NON_RF_SPACE):
+                key = " ".join(sorted(set(text.split())))
+            if key not in seen:
+                seen.add(key)
+                self._keys.append(key)
+                self._first.append(i)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def best_match(self, query: str, threshold: float | None = None) -> tuple[str, float] | None:
+        """Same result as ``best_match(query, self.candidates, threshold)``."""
+        return self.best_matches([query], threshold)[0]
+
+    def best_matches(
+        self,
+        queries: list[str],
+        threshold: float | None = None,
+    ) -> list[tuple[str, float] | None]:
+        """Same result as ``best_matches_batch(queries, self.candidates, threshold)``."""
+        # Keys are in first-seen order, so the earliest tied key is also the
+        # earliest tied candidate.
+        hits = _best_indices(queries, self._keys, threshold)
+        return [(self.candidates[self._first[hit[0]]], hit[1]) if hit else None for hit in hits]
+
+
 def all_matches(
     query: str,
     candidates: list[str],
@@ -9,14 +9,20 @@ Workflow:
     1. Caller saves a reference crop: save_template(label, crop)
     2. On OCR failure, ActionExecutor calls find_template(label, frame)
     3. Returns (cx, cy) of best match centre, or None
+    4. Repeated controls (several "Edit" buttons): find_all(label, frame)
+       lists every instance top-to-bottom; find(..., match_index=n) picks one
 
 Template storage: memory/templates/<context_id>/<normalized_label>.png
+(single-channel gray; older colour templates are still read)
 """
 from __future__ import annotations
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -34,6 +40,140 @@ _TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
 # ── Tuning constants ──────────────────────────────────────────────────────────
 _MIN_MATCH_SCORE = 0.72    # Normalised cross-correlation threshold
 _SCALE_RANGE     = (0.85, 1.15, 0.05)   # start, stop, step for multi-scale
+_TEMPLATE_CACHE  = 256     # stored templates kept decoded + pre-scaled in memory
+_FLAT_RANGE      = 1       # windows whose gray range is at most this are plain background
+
+# Coarse-to-fine search: match on a Gaussian pyramid level, then re-match at
+# full resolution only in windows around the best coarse peaks.
+_PYR_MAX_LEVELS  = 3       # at most 1/8 resolution
+_PYR_MIN_SIDE    = 8       # coarse needle must keep at least this many px per side
+_PYR_SLACK       = 0.20    # coarse peaks within this of the coarse max are refined
+_PYR_MARGIN      = 8       # full-res refinement window padding (px)
+_EARLY_EXIT      = 0.99    # a refined score this high ends the scale sweep
+
+# Coarse passes of the non-native scales are independent and OpenCV releases
+# the GIL, so they share a small thread pool (None = run serially).
+_SWEEP_WORKERS   = getattr(config, "TEMPLATE_MATCH_WORKERS", 1)
+_SWEEP_POOL      = (ThreadPoolExecutor(max_workers=_SWEEP_WORKERS, thread_name_prefix="template-sweep")
+                    if _SWEEP_WORKERS > 1 else None)
+
+# find_all(): every instance of a template at the winning scale
+_FIND_ALL_TOP_K  = 20      # strongest instances returned
+_NMS_IOU         = 0.3     # instances overlapping a stronger one by more are duplicates
+
+
+def _scales() -> List[float]:
+    start, stop, step = _SCALE_RANGE
+    out, scale = [], start
+    while scale <= stop + 1e-6:
+        out.append(scale)
+        scale = round(scale + step, 3)
+    return out
+
+
+_SCALES = _scales()
+
+# (scale, gray needle pyramid [full res, 1/2, ...], unclamped scaled (h, w)) per scale
+Needles = Tuple[Tuple[float, Tuple[np.ndarray, ...], Tuple[int, int]], ...]
+
+
+def _gray(image: np.ndarray) -> np.ndarray:
+    """Single-channel view of *image*; gray input is passed through untouched."""
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _needle_pyramid(needle: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """*needle* and its pyrDown levels, as deep as the coarse search may use."""
+    levels = [needle]
+    while (len(levels) <= _PYR_MAX_LEVELS
+           and min(needle.shape[:2]) >> len(levels) >= _PYR_MIN_SIDE):
+        level = cv2.pyrDown(levels[-1])
+        level.flags.writeable = False
+        levels.append(level)
+    return tuple(levels)
+
+
+def _scale_needles(n_gray: np.ndarray) -> Needles:
+    """
+    Gray needle resized to every sweep scale, with its coarse levels
+    (the template-invariant work).
+    Shrinks use INTER_AREA so thin glyph strokes average instead of alias.
+    """
+    th, tw = n_gray.shape[:2]
+    out = []
+    for scale in _SCALES:
+        interp  = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        resized = cv2.resize(n_gray, (max(4, int(tw * scale)), max(4, int(th * scale))),
+                             interpolation=interp)
+        resized.flags.writeable = False
+        out.append((scale, _needle_pyramid(resized), (int(th * scale), int(tw * scale))))
+    return tuple(out)
+
+
+@lru_cache(maxsize=_TEMPLATE_CACHE)
+def _load_needles(path: str, mtime_ns: int) -> Optional[Needles]:
+    """
+    Decode a stored template and build its scaled needle pyramids once.
+    Keyed on mtime so a re-saved template is picked up on the next find().
+    Gray files decode straight to the needle; legacy colour files are
+    converted with cvtColor, exactly as before.
+    """
+    tmpl = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if tmpl is None or tmpl.size == 0:
+        return None
+    return _scale_needles(_gray(tmpl))
+
+
+class _Pyramid:
+    """Gaussian pyramid of one gray frame, built lazily and shared by every scale of a sweep."""
+
+    def __init__(self, gray: np.ndarray) -> None:
+        self.levels = [gray]
+        self._lock  = threading.Lock()   # sweep threads may request a level at once
+
+    def level(self, n: int) -> np.ndarray:
+        with self._lock:
+            while len(self.levels) <= n:
+                self.levels.append(cv2.pyrDown(self.levels[-1]))
+        return self.levels[n]
+
+
+def _sweep_map(fn: Callable, items: list) -> list:
+    """[fn(item) for item in items], on the sweep pool when there is one."""
+    if _SWEEP_POOL is None or len(items) < 2:
+        return [fn(item) for item in items]
+    return list(_SWEEP_POOL.map(fn, items))
+
+
+def _flat_windows(image: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Mask, laid out like matchTemplate output, of *shape*-sized windows whose
+    gray range (max - min) is at most _FLAT_RANGE. Rectangular erode/dilate
+    are separable running min/max on uint8, far cheaper than variance from
+    float64 integral images.
+    """
+    h, w   = shape[:2]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (w, h))
+    hi     = cv2.dilate(image, kernel, anchor=(0, 0), borderType=cv2.BORDER_REPLICATE)
+    lo     = cv2.erode(image,  kernel, anchor=(0, 0), borderType=cv2.BORDER_REPLICATE)
+    H, W   = image.shape[:2]
+    return cv2.subtract(hi, lo)[:H - h + 1, :W - w + 1] <= _FLAT_RANGE
+
+
+def _match(image: np.ndarray, needle: np.ndarray) -> np.ndarray:
+    """TM_CCOEFF_NORMED of *needle* over *image*, flat windows set to -1."""
+    result = cv2.matchTemplate(image, needle, cv2.TM_CCOEFF_NORMED)
+    result[_flat_windows(image, needle.shape)] = -1.0
+    return result
+
+
+def _peak(result: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    """
+    (max, (x, y)) of a match map, as cv2.minMaxLoc would return them (first
+    maximum in row-major order) without also tracking the minimum.
+    """
+    i = int(result.argmax())
+    return float(result.flat[i]), (i % result.shape[1], i // result.shape[1])
 
 
 class TemplateMatcher:
@@ -48,7 +188,8 @@ class TemplateMatcher:
 
         Args:
             label:      Human-readable button label.
-            crop:       BGR image array.
+            crop:       BGR (or gray) image array; stored as gray, which is
+                        all matching uses.
             context_id: Folder name (e.g. test_id or app_name).
         """
         key  = normalize(label) or "unknown"
@@ -56,7 +197,7 @@ class TemplateMatcher:
         ctx_dir.mkdir(parents=True, exist_ok=True)
         
         path = ctx_dir / f"{key}.png"
-        ok   = cv2.imwrite(str(path), crop)
+        ok   = cv2.imwrite(str(path), _gray(crop))
         if ok:
             log.debug("Template saved: [%s] %s → %s", context_id, label, path.name)
         else:
@@ -68,22 +209,27 @@ class TemplateMatcher:
         frame:      np.ndarray,
         region:     Optional[dict] = None,
         context_id: str = "default",
+        match_index: Optional[int] = None,
     ) -> Optional[Tuple[int, int]]:
         """
         Search *frame* for a stored template image of *label*.
+
+        By default returns the best-scoring match. With *match_index*, returns
+        that instance of find_all() instead (0 = topmost, -1 = bottom-most).
         """
-        key  = normalize(label) or "unknown"
-        path = _TEMPLATE_DIR / context_id / f"{key}.png"
-        if not path.exists():
-            log.debug("No template found for '%s' in context '%s'", label, context_id)
-            return None
+        if match_index is not None:
+            hits = self.find_all(label, frame, region, context_id)
+            if not -len(hits) <= match_index < len(hits):
+                log.debug("Template '%s': no instance #%d (%d found)", label, match_index, len(hits))
+                return None
+            cx, cy, _ = hits[match_index]
+            return cx, cy
 
-        tmpl = cv2.imread(str(path))
-        if tmpl is None or tmpl.size == 0:
-            log.warning("Template file corrupt: %s", path)
+        needles = self._stored_needles(label, context_id)
+        if needles is None:
             return None
 
-        result = self._multi_scale_match(frame, tmpl)
+        result = self._multi_scale_match(frame, needles)
         if result is None:
             log.debug("Template match failed for '%s' (score below threshold)", label)
             return None
@@ -95,6 +241,44 @@ class TemplateMatcher:
         log.info("Template match '%s' → screen (%d, %d)", label, cx, cy)
         return cx, cy
 
+    def find_all(
+        self,
+        label:      str,
+        frame:      np.ndarray,
+        region:     Optional[dict] = None,
+        context_id: str = "default",
+        top_k:      int = _FIND_ALL_TOP_K,
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Every instance of *label*'s stored template in *frame*, as screen
+        (cx, cy, score) sorted top-to-bottom, then left-to-right.
+
+        The scale is settled by the regular multi-scale search; that one
+        scale is then matched over the whole frame and overlapping hits are
+        merged by non-maximum suppression.
+        """
+        needles = self._stored_needles(label, context_id)
+        if needles is None:
+            return []
+
+        pyramid = _Pyramid(_gray(frame))
+        best    = self._best_needle(pyramid, needles)
+        if best is None:
+            log.debug("Template match failed for '%s' (score below threshold)", label)
+            return []
+
+        _, _, (_, levels, (th_s, tw_s)) = best
+        scores = _match(pyramid.level(0), levels[0])
+        ox     = int(region.get("left", 0)) if region else 0
+        oy     = int(region.get("top",  0)) if region else 0
+        hits   = [
+            (x + tw_s // 2 + ox, y + th_s // 2 + oy, score)
+            for x, y, score in self._nms(scores, levels[0].shape, top_k)
+        ]
+        hits.sort(key=lambda h: (h[1], h[0]))
+        log.info("Template '%s': %d instance(s) found", label, len(hits))
+        return hits
+
     def find_from_crop(
         self,
         template_crop: np.ndarray,
@@ -105,7 +289,8 @@ class TemplateMatcher:
         Match an *ad-hoc* template crop (not from disk) against *frame*.
         Useful when a reference image is captured live.
         """
-        result = self._multi_scale_match(frame, template_crop)
+        needles = _scale_needles(_gray(template_crop))
+        result  = self._multi_scale_match(frame, needles)
         if result is None:
             return None
         ox = int(region.get("left", 0)) if region else 0
@@ -114,51 +299,199 @@ class TemplateMatcher:
 
     # ── Private ────────────────────────────────────────────────────────────────
 
+    @staticmethod
+    def _stored_needles(label: str, context_id: str) -> Optional[Needles]:
+        """Cached needles of *label*'s saved template, or None if missing/corrupt."""
+        key  = normalize(label) or "unknown"
+        path = _TEMPLATE_DIR / context_id / f"{key}.png"
+        if not path.exists():
+            log.debug("No template found for '%s' in context '%s'", label, context_id)
+            return None
+
+        needles = _load_needles(str(path), path.stat().st_mtime_ns)
+        if needles is None:
+            log.warning("Template file corrupt: %s", path)
+        return needles
+
     def _multi_scale_match(
         self,
         haystack: np.ndarray,
-        needle: np.ndarray,
+        needles: Needles,
     ) -> Optional[Tuple[int, int]]:
         """
         Run TM_CCOEFF_NORMED at multiple scales.
         Returns (cx, cy) *relative to haystack origin* for the best match.
         """
-        h_gray = cv2.cvtColor(haystack, cv2.COLOR_BGR2GRAY)
-        n_gray = cv2.cvtColor(needle,   cv2.COLOR_BGR2GRAY)
+        best = self._best_needle(_Pyramid(_gray(haystack)), needles)
+        if best is None:
+            return None
 
-        th, tw = n_gray.shape[:2]
-        best_score = -1.0
-        best_loc   = None
-        best_scale = 1.0
+        best_score, best_loc, (best_scale, _, (th_s, tw_s)) = best
+        cx   = best_loc[0] + tw_s // 2
+        cy   = best_loc[1] + th_s // 2
+        log.debug("Template match score=%.3f scale=%.2f → (%d, %d)", best_score, best_scale, cx, cy)
+        return cx, cy
 
-        start, stop, step = _SCALE_RANGE
-        scale = start
-        while scale <= stop + 1e-6:
-            nh = max(4, int(th * scale))
-            nw = max(4, int(tw * scale))
-            resized = cv2.resize(n_gray, (nw, nh))
+    def _best_needle(
+        self,
+        pyramid: _Pyramid,
+        needles: Needles,
+    ) -> Optional[Tuple[float, Tuple[int, int], Tuple]]:
+        """
+        (score, top-left, needle entry) of the best match over all scales,
+        or None below _MIN_MATCH_SCORE.
+        """
+        h_gray = pyramid.levels[0]
+
+        best_score  = -1.0
+        best_loc    = None
+        best_needle = None
 
+        # Native scale goes first: templates come from this display, so a
+        # near-exact hit there ends the sweep outright. Every other scale is
+        # refined too: a coarse peak does not rank scales reliably (look-alike
+        # controls can outscore the true one at low resolution), it only
+        # orders them so the early exit skips the likely-weaker ones.
+        pending = []
+        for scale, levels, size in sorted(needles, key=lambda n: n[0] != 1.0):
+            resized = levels[0]
             # Skip if template is larger than haystack
             if resized.shape[0] > h_gray.shape[0] or resized.shape[1] > h_gray.shape[1]:
-                scale += step
+                continue
+            if scale != 1.0:
+                pending.append((scale, levels, size))
                 continue
 
-            result = cv2.matchTemplate(h_gray, resized, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            level, coarse = self._coarse(pyramid, levels)
+            best_score, best_loc = self._refine(pyramid, resized, level, coarse)
+            best_needle          = (scale, levels, size)
+            if best_score >= _EARLY_EXIT:
+                return best_score, best_loc, best_needle
 
-            if max_val > best_score:
-                best_score = max_val
-                best_loc   = max_loc
-                best_scale = scale
+        coarse_runs = []
+        for (scale, levels, size), (level, coarse) in zip(
+            pending, _sweep_map(lambda needle: self._coarse(pyramid, needle[1]), pending)
+        ):
+            top = float(coarse.max()) if coarse is not None else 1.0
+            coarse_runs.append((scale, levels, size, level, coarse, top))
+
+        coarse_runs.sort(key=lambda run: -run[5])
+        for scale, levels, size, level, coarse, top in coarse_runs:
+            max_val, max_loc = self._refine(pyramid, levels[0], level, coarse)
 
-            scale = round(scale + step, 3)
+            if max_val > best_score:
+                best_score  = max_val
+                best_loc    = max_loc
+                best_needle = (scale, levels, size)
+                if best_score >= _EARLY_EXIT:
+                    break
 
         if best_score < _MIN_MATCH_SCORE or best_loc is None:
             return None
+        return best_score, best_loc, best_needle
 
-        th_s = int(th * best_scale)
-        tw_s = int(tw * best_scale)
-        cx   = best_loc[0] + tw_s // 2
-        cy   = best_loc[1] + th_s // 2
-        log.debug("Template match score=%.3f scale=%.2f → (%d, %d)", best_score, best_scale, cx, cy)
-        return cx, cy
+    @staticmethod
+    def _nms(
+        scores: np.ndarray,
+        shape:  Tuple[int, ...],
+        top_k:  int,
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Greedy non-maximum suppression over a score map: local peaks at or
+        above _MIN_MATCH_SCORE, strongest first, dropping any whose *shape*
+        window overlaps an already kept one by more than _NMS_IOU.
+        Returns up to *top_k* (x, y, score) top-left hits.
+        """
+        nh, nw = shape[:2]
+        peaks  = (scores >= _MIN_MATCH_SCORE) & (scores == cv2.dilate(scores, np.ones((3, 3), np.uint8)))
+        ys, xs = np.nonzero(peaks)
+        order  = np.argsort(-scores[ys, xs], kind="stable")
+        xs, ys = xs[order], ys[order]
+        vals   = scores[ys, xs]
+        if not len(vals):
+            return []
+
+        # Each kept hit clears every candidate it overlaps in one vector op,
+        # itself included (IoU 1), so the loop runs at most top_k times.
+        alive = np.ones(len(vals), dtype=bool)
+        kept: List[Tuple[int, int, float]] = []
+        i = 0
+        while len(kept) < top_k:
+            i += int(np.argmax(alive[i:]))
+            if not alive[i]:
+                break
+            x, y  = int(xs[i]), int(ys[i])
+            kept.append((x, y, float(vals[i])))
+            inter = np.maximum(0, nw - np.abs(xs - x)) * np.maximum(0, nh - np.abs(ys - y))
+            alive &= inter / (2 * nw * nh - inter) <= _NMS_IOU
+        return kept
+
+    @staticmethod
+    def _coarse(
+        pyramid: _Pyramid,
+        levels:  Tuple[np.ndarray, ...],
+    ) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        (level, coarse score map) for a needle pyramid on the deepest
+        haystack level it fits, or (0, None) when it is too small to coarsen.
+        Flat background windows score a degenerate ±1 and are dropped.
+        """
+        H, W   = pyramid.levels[0].shape[:2]
+        nh, nw = levels[0].shape[:2]
+        level  = 0
+        while (level + 1 < len(levels)
+               and H >> (level + 1) >= nh >> (level + 1)
+               and W >> (level + 1) >= nw >> (level + 1)):
+            level += 1
+        if level == 0:
+            return 0, None
+        return level, _match(pyramid.level(level), levels[level])
+
+    @staticmethod
+    def _refine(
+        pyramid: _Pyramid,
+        needle:  np.ndarray,
+        level:   int,
+        coarse:  Optional[np.ndarray],
+    ) -> Tuple[float, Tuple[int, int]]:
+        """
+        Best TM_CCOEFF_NORMED (score, top-left) of *needle* in the full frame.
+
+        Merges the coarse peaks within _PYR_SLACK of the coarse max into
+        regions (threshold + 3x3 closing) and re-matches at full resolution
+        inside every one of them. NCC is local, so refined scores equal the
+        full-frame scores at those spots. Look-alike controls (repeated
+        buttons) can outscore the true spot at low resolution, so no region
+        is dropped for ranking low; and if even the best refined score trails
+        the coarse max by more than the slack, the coarse map misled us and
+        the whole frame is matched, as it is without a coarse map.
+        """
+        H, W   = pyramid.levels[0].shape[:2]
+        nh, nw = needle.shape[:2]
+        if coarse is None:
+            return _peak(_match(pyramid.level(0), needle))
+
+        top = float(coarse.max())
+        if top <= -1.0:
+            return -1.0, (0, 0)
+        mask = (coarse >= top - _PYR_SLACK).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        f       = 1 << level
+        max_val = -1.0
+        max_loc = (0, 0)
+        for x, y, w, h in stats[1:, :4].tolist():
+            x0 = max(0, x * f - _PYR_MARGIN)
+            y0 = max(0, y * f - _PYR_MARGIN)
+            x1 = min(W, (x + w) * f + _PYR_MARGIN + nw)
+            y1 = min(H, (y + h) * f + _PYR_MARGIN + nh)
+            if x1 - x0 < nw or y1 - y0 < nh:
+                continue
+            val, loc = _peak(_match(pyramid.level(0)[y0:y1, x0:x1], needle))
+            if val > max_val:
+                max_val = val
+                max_loc = (loc[0] + x0, loc[1] + y0)
+        if max_val < top - _PYR_SLACK:
+            return _peak(_match(pyramid.level(0), needle))
+        return max_val, max_loc
@@ -6,7 +6,7 @@
 ╚══════════════════════════════════════════════════════════════════╝
 
 Usage:
-    from vision.text_normalizer import normalize, normalized_pairs
+    from vision.text_normalizer import normalize, normalized_pairs, normalize_ocr
 
 Examples:
     normalize("0K")     → "ok"
@@ -18,6 +18,7 @@ from __future__ import annotations
 
 import re
 import unicodedata
+from functools import lru_cache
 from typing import List, Tuple
 
 # ── OCR confusion map (applied left-to-right, order matters) ─────────────────
@@ -41,6 +42,17 @@ _CONFUSION_MAP: List[Tuple[str, str]] = [
     # Common UI word fixes (applied whole-string only via dedicated table)
 ]
 
+# The map compiled into two passes: one translate for every 1-char entry,
+# then one regex sweep for the clusters. Equivalent to applying the pairs in
+# order: no 1-char output is itself remapped and no two clusters overlap.
+_CHARS      = [(w, r) for w, r in _CONFUSION_MAP if len(w) == 1]
+_CHAR_TABLE = str.maketrans(dict(_CHARS))
+_CHAR_BYTES = bytes.maketrans("".join(w for w, _ in _CHARS).encode(),   # ASCII fast path
+                              "".join(r for _, r in _CHARS).encode())
+_CLUSTERS   = {w: r for w, r in _CONFUSION_MAP if len(w) > 1}
+_CLUSTER_RE = re.compile("|".join(map(re.escape, _CLUSTERS)))
+_JUNK_RE    = re.compile(r"[^\w\s]+")
+
 # Whole-string substitutions for specific known misreads of common UI labels
 _WHOLE_WORD_FIXES: dict[str, str] = {
     "0k":      "ok",
@@ -58,19 +70,23 @@ _WHOLE_WORD_FIXES: dict[str, str] = {
 }
 
 
+def _cluster_fix(m: re.Match) -> str:
+    return _CLUSTERS[m.group()]
+
+
+@lru_cache(maxsize=4096)
 def normalize(text: str) -> str:
     """
     Normalize a raw OCR string into a clean, lowercase, de-noised form
-    suitable for fuzzy matching.
+    suitable for fuzzy matching. Memoized: UI labels and targets repeat.
 
     Pipeline:
         1. Unicode NFKC normalisation (converts fullwidth chars, ligatures)
-        2. Strip surrounding whitespace
-        3. Lowercase
-        4. Collapse internal whitespace runs to single space
-        5. Remove non-alphanumeric junk characters (keep spaces)
-        6. Apply OCR confusion map character substitutions
-        7. Apply whole-word dictionary correction for known misreads
+        2. Lowercase
+        3. Replace non-alphanumeric junk characters with spaces
+        4. Strip, and collapse internal whitespace runs to single space
+        5. Apply OCR confusion map character substitutions
+        6. Apply whole-word dictionary correction for known misreads
     """
     if not text:
         return ""
@@ -78,21 +94,23 @@ def normalize(text: str) -> str:
     # 1. Unicode normalisation
     t = unicodedata.normalize("NFKC", text)
 
-    # 2–3. Strip + lowercase
-    t = t.strip().lower()
+    # 2. Lowercase
+    t = t.lower()
 
-    # 4. Collapse whitespace
-    t = re.sub(r"\s+", " ", t)
+    # 3. Remove non-alphanumeric except spaces (keeps hyphens etc as spaces)
+    t = _JUNK_RE.sub(" ", t)
 
-    # 5. Remove non-alphanumeric except spaces (keeps hyphens etc as spaces)
-    t = re.sub(r"[^\w\s]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    # 4. Strip + collapse whitespace
+    t = " ".join(t.split())
 
-    # 6. OCR confusion map (character-level)
-    for wrong, right in _CONFUSION_MAP:
-        t = t.replace(wrong, right)
+    # 5. OCR confusion map (1-char table, then clusters)
+    if t.isascii():
+        t = t.encode().translate(_CHAR_BYTES).decode()
+    else:
+        t = t.translate(_CHAR_TABLE)
+    t = _CLUSTER_RE.sub(_cluster_fix, t)
 
-    # 7. Whole-word dictionary
+    # 6. Whole-word dictionary
     fixed = _WHOLE_WORD_FIXES.get(t)
     if fixed:
         t = fixed
@@ -116,10 +134,17 @@ def normalized_pairs(
     This lets the caller compare norm↔norm while still having
     the original text and box available.
     """
-    norm_target = normalize(target)
+    return normalize_ocr(ocr_results), normalize(target)
+
+
+def normalize_ocr(ocr_results: list[dict]) -> list[dict]:
+    """
+    Target-independent half of normalized_pairs(): a copy of *ocr_results*
+    with a 'norm' key added. Reusable across targets on the same frame.
+    """
     out = []
     for r in ocr_results:
         copy = dict(r)
         copy["norm"] = normalize(r.get("text", ""))
         out.append(copy)
-    return out, norm_target
+    return out